@@ -0,0 +1,155 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialized.
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+
+ESSENTIAL_CALLS = ("geocode", "reverse_geocode")
+DEFAULT_DEGRADE_ORDER = ("landmark", "subway", "competition")
+_STATE_LOCK = threading.Lock()
+
+
+class ApiBudgetExceeded(SystemExit):
+    pass
+
+
+@contextmanager
+def locked_state(state_path: Path) -> Iterator[None]:
+    """Serialize read-modify-write of the state file across threads and processes."""
+    with _STATE_LOCK:
+        if fcntl is None:
+            yield
+            return
+        state_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(state_path.with_suffix(state_path.suffix + ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class ApiBudget:
+    """Per-run and per-day Naver API call limits (0 means unlimited).
+
+    The per-day counter lives in a small JSON file shared by every run on this machine. With a
+    per-day limit each call is checked against and added to it under a file lock, so concurrent
+    runs and web workers share the daily cap; otherwise calls are added on ``save``.
+    """
+
+    def __init__(
+        self,
+        per_run: int = 0,
+        per_day: int = 0,
+        state_path: Optional[Path] = None,
+        on_exceed: str = "degrade",
+    ):
+        self.per_run = per_run
+        self.per_day = per_day
+        self.state_path = state_path
+        self.on_exceed = on_exceed
+        self.used = 0
+        self.by_api: Dict[str, int] = {}
+        self._unsaved = 0
+        self._day_used = self._load_day_used()
+
+    def _load_day_used(self) -> int:
+        if not self.state_path or not self.state_path.exists():
+            return 0
+        try:
+            state = json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            logger.warning("Ignoring unreadable API budget state %s", self.state_path)
+            return 0
+        if state.get("date") != date.today().isoformat():
+            return 0
+        return int(state.get("calls", 0))
+
+    def _shared_day(self) -> bool:
+        return self.per_day > 0 and self.state_path is not None
+
+    def remaining(self) -> Optional[int]:
+        limits = []
+        if self.per_run > 0:
+            limits.append(self.per_run - self.used)
+        if self.per_day > 0:
+            if self._shared_day():
+                self._day_used = self._load_day_used()
+            limits.append(self.per_day - self._day_used - self._unsaved)
+        return max(min(limits), 0) if limits else None
+
+    def _exhausted(self) -> ApiBudgetExceeded:
+        return ApiBudgetExceeded(
+            f"API call budget exhausted after {self.used} calls this run "
+            f"(per run {self.per_run or 'unlimited'}, per day {self.per_day or 'unlimited'})"
+        )
+
+    def charge(self, api: str, count: int = 1) -> None:
+        if self.per_run > 0 and self.per_run - self.used < count:
+            raise self._exhausted()
+        if self._shared_day():
+            with locked_state(self.state_path):
+                day_used = self._load_day_used()
+                if self.per_day - day_used < count:
+                    raise self._exhausted()
+                self._write_day_used(day_used + count)
+                self._day_used = day_used + count
+        else:
+            if self.per_day > 0 and self.per_day - self._day_used - self._unsaved < count:
+                raise self._exhausted()
+            self._unsaved += count
+        self.used += count
+        self.by_api[api] = self.by_api.get(api, 0) + count
+
+    def plan(self, estimate: Dict[str, int], degrade_order: Sequence[str] = DEFAULT_DEGRADE_ORDER) -> List[str]:
+        """Return the optional call groups to drop so ``estimate`` fits the remaining budget."""
+        remaining = self.remaining()
+        total = sum(estimate.values())
+        if remaining is None or total <= remaining:
+            return []
+        message = f"Run needs up to {total} API calls but only {remaining} remain in the budget"
+        if self.on_exceed != "degrade":
+            raise ApiBudgetExceeded(message)
+        dropped: List[str] = []
+        for group in degrade_order:
+            if total <= remaining:
+                break
+            if estimate.get(group) and group not in ESSENTIAL_CALLS:
+                total -= estimate[group]
+                dropped.append(group)
+        if total > remaining:
+            raise ApiBudgetExceeded(message)
+        return dropped
+
+    def save(self) -> None:
+        if not self.state_path or not self._unsaved:
+            return
+        with locked_state(self.state_path):
+            self._day_used = self._load_day_used() + self._unsaved
+            self._write_day_used(self._day_used)
+            self._unsaved = 0
+
+    def _write_day_used(self, calls: int) -> None:
+        # Callers hold locked_state; the temp file is unique so no other writer can clobber it.
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self.state_path.parent, prefix=self.state_path.name, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump({"date": date.today().isoformat(), "calls": calls}, handle)
+            os.replace(tmp_name, self.state_path)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
@@ -0,0 +1,31 @@
+import argparse
+import json
+
+
+# Kept free of third-party imports so the daemon client starts fast.
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Keyword generator for Naver search ads")
+    parser.add_argument("--input", required=True, help="Business input CSV")
+    parser.add_argument("--ad-groups", required=True, help="Ad group CSV with ad_group_id column")
+    parser.add_argument("--output-dir", required=True, help="Output directory for CSV files")
+    parser.add_argument("--config", default="config.yaml", help="Config YAML path")
+    parser.add_argument("--account", help="Naver ad account; skips keywords already exported to it")
+    parser.add_argument("--log-level", default="INFO")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile each pipeline stage and write .pstats/.collapsed files to the output directory",
+    )
+    parser.add_argument(
+        "--estimate-calls",
+        action="store_true",
+        help="Print the estimated Naver API calls for the input and exit without calling the APIs",
+    )
+    return parser
+
+
+def print_result(args: argparse.Namespace, result: dict) -> None:
+    if args.estimate_calls:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
@@ -0,0 +1,201 @@
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import sys
+import tempfile
+from array import array
+from pathlib import Path
+from typing import List, Optional
+
+from cli_args import build_arg_parser, print_result
+
+
+# Long-lived worker for scheduled CLI runs. ``serve`` keeps one PipelineRuntime (config, API
+# sessions, geocode caches, offline indexes) warm and takes jobs over a Unix socket; ``run`` is the
+# thin client with main.py's arguments. Only ``serve`` and the in-process fallback import main.
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent
+PATH_ARGS = ("input", "ad_groups", "output_dir", "config")
+
+
+def default_socket_path() -> str:
+    return os.environ.get("KEYWORD_DAEMON_SOCKET") or os.path.join(
+        tempfile.gettempdir(), f"keyword-generator-{os.getuid()}.sock"
+    )
+
+
+def json_default(value):
+    return value.tolist() if isinstance(value, array) else str(value)
+
+
+def send_message(handle, message: dict) -> None:
+    handle.write(json.dumps(message, ensure_ascii=False, default=json_default).encode("utf-8") + b"\n")
+    handle.flush()
+
+
+class SocketLogHandler(logging.Handler):
+    """Forwards a job's log records to the client that submitted it."""
+
+    def __init__(self, stream, level: int):
+        super().__init__(level)
+        self.stream = stream
+        self.setFormatter(logging.Formatter("%(levelname)s: %(message)s"))
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            send_message(self.stream, {"log": self.format(record)})
+        except OSError:
+            # The client went away; the job still finishes and its output stays on disk.
+            pass
+
+
+class JobHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        from main import run_from_args
+
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            send_message(self.wfile, {"exit": 2, "error": "Malformed job request"})
+            return
+        args = argparse.Namespace(**request["args"])
+        level = logging.getLevelName(str(args.log_level).upper())
+        level = level if isinstance(level, int) else logging.INFO
+        root = logging.getLogger()
+        previous_level = root.level
+        handler = SocketLogHandler(self.wfile, level)
+        root.addHandler(handler)
+        root.setLevel(min(previous_level, level))
+        try:
+            message = {"result": run_from_args(args, self.server.runtime)}
+        except SystemExit as exc:
+            if exc.code is None or isinstance(exc.code, int):
+                message = {"exit": exc.code or 0, "error": None}
+            else:
+                message = {"exit": 1, "error": str(exc.code)}
+        except Exception as exc:  # noqa: BLE001
+            logger.exception("Job failed")
+            message = {"exit": 1, "error": f"{type(exc).__name__}: {exc}"}
+        finally:
+            root.removeHandler(handler)
+            root.setLevel(previous_level)
+        try:
+            send_message(self.wfile, message)
+        except OSError:
+            logger.warning("Client disconnected before the job finished")
+
+
+class JobServer(socketserver.UnixStreamServer):
+    # Jobs run one at a time: they share the runtime's clients and caches.
+
+    def __init__(self, socket_path: str, runtime):
+        self.runtime = runtime
+        super().__init__(socket_path, JobHandler)
+
+
+def claim_socket(socket_path: str) -> None:
+    if not os.path.exists(socket_path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(socket_path)
+            return
+    raise SystemExit(f"A keyword daemon is already listening on {socket_path}")
+
+
+def serve(socket_path: str, config_path: Path, log_level: str) -> None:
+    from main import PipelineRuntime, load_config
+
+    logging.basicConfig(level=log_level, format="%(levelname)s: %(message)s")
+    daemon_cfg = load_config(config_path).get("daemon", {}) or {}
+    runtime = PipelineRuntime(BASE_DIR / ".env", float(daemon_cfg.get("cache_ttl_sec", 0)))
+    claim_socket(socket_path)
+    server = JobServer(socket_path, runtime)
+    os.chmod(socket_path, 0o600)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    logger.info("Keyword daemon listening on %s", socket_path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        logger.info("Keyword daemon stopped")
+
+
+def run_in_process(args: argparse.Namespace) -> None:
+    from main import run_from_args
+
+    print_result(args, run_from_args(args))
+
+
+def run_client(argv: List[str]) -> None:
+    parser = build_arg_parser()
+    parser.add_argument("--socket", default=default_socket_path(), help="Daemon socket path")
+    parser.add_argument(
+        "--no-fallback",
+        action="store_true",
+        help="Fail instead of running in this process when no daemon is listening",
+    )
+    args = parser.parse_args(argv)
+    socket_path = args.socket
+    no_fallback = args.no_fallback
+    del args.socket, args.no_fallback
+    for name in PATH_ARGS:
+        setattr(args, name, os.path.abspath(getattr(args, name)))
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        client.close()
+        if no_fallback:
+            raise SystemExit(f"No keyword daemon listening on {socket_path}")
+        run_in_process(args)
+        return
+
+    with client, client.makefile("rwb") as handle:
+        send_message(handle, {"args": vars(args)})
+        result: Optional[dict] = None
+        for line in handle:
+            message = json.loads(line)
+            if "log" in message:
+                print(message["log"], file=sys.stderr)
+            elif "result" in message:
+                result = message["result"]
+            elif "exit" in message:
+                if message.get("error"):
+                    print(message["error"], file=sys.stderr)
+                raise SystemExit(message["exit"])
+    if result is None:
+        raise SystemExit("Keyword daemon closed the connection before the job finished")
+    print_result(args, result)
+
+
+def main() -> None:
+    if len(sys.argv) > 1 and sys.argv[1] == "run":
+        run_client(sys.argv[2:])
+        return
+    parser = argparse.ArgumentParser(description="Keyword generator daemon")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve_parser = subparsers.add_parser("serve", help="Keep a warm pipeline runtime and accept jobs")
+    serve_parser.add_argument("--socket", default=default_socket_path(), help="Socket path to listen on")
+    serve_parser.add_argument("--config", default=str(BASE_DIR / "config.yaml"), help="Config YAML path")
+    serve_parser.add_argument("--log-level", default="INFO")
+    subparsers.add_parser("run", help="Submit a job; takes the same arguments as main.py", add_help=False)
+    args = parser.parse_args()
+    serve(args.socket, Path(args.config), args.log_level)
+
+
+if __name__ == "__main__":
+    main()
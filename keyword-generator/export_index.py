@@ -0,0 +1,244 @@
+import hashlib
+import logging
+import math
+import re
+import sqlite3
+import struct
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+# magic, bit count, hash count, generation of the keywords table the filter reflects
+BLOOM_MAGIC = b"KGB2"
+BLOOM_HEADER = struct.Struct("<4sQIQ")
+ACCOUNT_RE = re.compile(r"[^\w.-]+")
+INSERT_BATCH = 10000
+# Released keywords keep their bits (a hit just costs an SQLite lookup) until this share of capacity.
+RELEASED_REBUILD_FRACTION = 0.05
+
+
+class BloomFilter:
+    def __init__(
+        self, num_bits: int, num_hashes: int, bits: Optional[bytearray] = None, generation: int = 0
+    ):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bits if bits is not None else bytearray((num_bits + 7) // 8)
+        self.generation = generation
+
+    @classmethod
+    def for_capacity(cls, capacity: int, error_rate: float) -> "BloomFilter":
+        num_bits = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        return cls(num_bits, num_hashes)
+
+    @classmethod
+    def load(cls, path: Path) -> "BloomFilter":
+        data = path.read_bytes()
+        if len(data) < BLOOM_HEADER.size:
+            raise ValueError(f"{path} is not a bloom filter")
+        magic, num_bits, num_hashes, generation = BLOOM_HEADER.unpack_from(data, 0)
+        if magic != BLOOM_MAGIC:
+            raise ValueError(f"{path} is not a bloom filter")
+        return cls(num_bits, num_hashes, bytearray(data[BLOOM_HEADER.size :]), generation)
+
+    def save(self, path: Path) -> None:
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with tmp_path.open("wb") as handle:
+            handle.write(BLOOM_HEADER.pack(BLOOM_MAGIC, self.num_bits, self.num_hashes, self.generation))
+            handle.write(self.bits)
+        tmp_path.replace(path)
+
+    def _positions(self, keyword: str) -> Iterator[int]:
+        digest = hashlib.blake2b(keyword.encode("utf-8"), digest_size=16).digest()
+        first, second = struct.unpack("<QQ", digest)
+        for index in range(self.num_hashes):
+            yield (first + index * second) % self.num_bits
+
+    def add(self, keyword: str) -> None:
+        for position in self._positions(keyword):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, keyword: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(keyword))
+
+
+class ExportedKeywordIndex:
+    """Keywords already exported to one ad account, and the ad group each one was last exported to.
+
+    A Bloom filter answers most lookups for new keywords in memory; possible hits are confirmed
+    against an SQLite table that holds the exact set; a filter file whose generation differs from the
+    table's is rebuilt from it. Keywords assigned to an exempt group (the groups being re-exported)
+    are not reported as exported, so they can keep their place.
+    """
+
+    def __init__(self, root: Path, account: str, capacity: int = 10_000_000, error_rate: float = 0.001):
+        self.account = account
+        self.capacity = capacity
+        self.error_rate = error_rate
+        root.mkdir(parents=True, exist_ok=True)
+        name = ACCOUNT_RE.sub("_", account).strip("_") or "default"
+        self.db_path = root / f"{name}.sqlite"
+        self.bloom_path = root / f"{name}.bloom"
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS keywords (keyword TEXT PRIMARY KEY, exported_at TEXT) WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS assignments "
+            "(keyword TEXT PRIMARY KEY, ad_group_id TEXT NOT NULL, position INTEGER NOT NULL) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS assignments_group ON assignments (ad_group_id, position)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.commit()
+        self.exempt_groups: Set[str] = set()
+        self.bloom = self._load_bloom()
+
+    def _meta(self, key: str) -> int:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def _set_meta(self, key: str, value: int) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _generation(self) -> int:
+        return self._meta("generation")
+
+    def _load_bloom(self) -> BloomFilter:
+        generation = self._generation()
+        stale = self.bloom_path.exists()
+        if stale:
+            try:
+                bloom = BloomFilter.load(self.bloom_path)
+            except ValueError:
+                bloom = None
+            if bloom is not None and bloom.generation == generation:
+                return bloom
+            logger.warning("Exported-keyword filter for %s is out of date; rebuilding", self.account)
+        bloom = self._build_bloom()
+        bloom.generation = generation
+        self._set_meta("released", 0)
+        self._conn.commit()
+        if stale or len(self):
+            bloom.save(self.bloom_path)
+        return bloom
+
+    def _build_bloom(self) -> BloomFilter:
+        bloom = BloomFilter.for_capacity(self.capacity, self.error_rate)
+        count = 0
+        for (keyword,) in self._conn.execute("SELECT keyword FROM keywords"):
+            bloom.add(keyword)
+            count += 1
+        if count:
+            logger.info("Rebuilt exported-keyword filter for %s from %s keywords", self.account, count)
+        return bloom
+
+    def _commit(self, released: int = 0) -> None:
+        generation = self._generation() + 1
+        self._set_meta("generation", generation)
+        released += self._meta("released")
+        rebuild = released >= self.capacity * RELEASED_REBUILD_FRACTION
+        self._set_meta("released", 0 if rebuild else released)
+        self._conn.commit()
+        if rebuild:
+            self.bloom = self._build_bloom()
+        self.bloom.generation = generation
+        self.bloom.save(self.bloom_path)
+
+    def refresh(self) -> None:
+        """Reload the filter if another connection has recorded an export since it was loaded."""
+        if self._generation() != self.bloom.generation:
+            self.bloom = self._load_bloom()
+
+    def __contains__(self, keyword: str) -> bool:
+        return self.exported(keyword, self.exempt_groups)
+
+    def exported(self, keyword: str, exempt_groups: Set[str]) -> bool:
+        """Whether ``keyword`` was exported to a group other than ``exempt_groups``."""
+        if keyword not in self.bloom:
+            return False
+        if not exempt_groups:
+            row = self._conn.execute("SELECT 1 FROM keywords WHERE keyword = ?", (keyword,)).fetchone()
+            return row is not None
+        row = self._conn.execute(
+            "SELECT a.ad_group_id FROM keywords k LEFT JOIN assignments a ON a.keyword = k.keyword "
+            "WHERE k.keyword = ?",
+            (keyword,),
+        ).fetchone()
+        return row is not None and row[0] not in exempt_groups
+
+    def assignment(self, ad_group_ids: Sequence[str]) -> Dict[str, List[str]]:
+        """Keywords currently assigned to each of ``ad_group_ids``, in their exported order."""
+        groups: Dict[str, List[str]] = {ad_group_id: [] for ad_group_id in ad_group_ids}
+        for ad_group_id in groups:
+            rows = self._conn.execute(
+                "SELECT keyword FROM assignments WHERE ad_group_id = ? ORDER BY position",
+                (ad_group_id,),
+            )
+            groups[ad_group_id] = [keyword for (keyword,) in rows]
+        return groups
+
+    def record_assignment(self, groups: Iterable[Tuple[str, Iterable[str]]], release: bool = False) -> int:
+        """Record an export: each group's keyword list replaces its previous one.
+
+        With ``release`` (the export removed keywords from their groups), keywords dropped from a
+        group and not assigned anywhere else are no longer exported, so later runs can generate them
+        again. Otherwise they stay exported: they are still live in the account.
+        """
+        added = 0
+        dropped: Set[str] = set()
+        for ad_group_id, keywords in groups:
+            keywords = list(keywords)
+            if release:
+                dropped.update(self.assignment([ad_group_id])[ad_group_id])
+            self._conn.execute("DELETE FROM assignments WHERE ad_group_id = ?", (ad_group_id,))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO assignments (keyword, ad_group_id, position) VALUES (?, ?, ?)",
+                ((keyword, ad_group_id, position) for position, keyword in enumerate(keywords)),
+            )
+            added += self.add_many(keywords, commit=False)
+        before = self._conn.total_changes
+        self._conn.executemany(
+            "DELETE FROM keywords WHERE keyword = ? "
+            "AND NOT EXISTS (SELECT 1 FROM assignments WHERE assignments.keyword = keywords.keyword)",
+            ((keyword,) for keyword in dropped),
+        )
+        removed = self._conn.total_changes - before
+        if removed:
+            logger.info("Released %s keywords removed from their ad groups for %s", removed, self.account)
+        self._commit(released=removed)
+        return added
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM keywords").fetchone()[0]
+
+    def add_many(self, keywords: Iterable[str], commit: bool = True) -> int:
+        batch: List[str] = []
+        added = 0
+        for keyword in keywords:
+            batch.append(keyword)
+            if len(batch) >= INSERT_BATCH:
+                added += self._insert(batch)
+                batch = []
+        if batch:
+            added += self._insert(batch)
+        if commit:
+            self._commit()
+            logger.info("Recorded %s new exported keywords for %s", added, self.account)
+        return added
+
+    def _insert(self, keywords: List[str]) -> int:
+        before = self._conn.total_changes
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO keywords (keyword, exported_at) VALUES (?, datetime('now'))",
+            ((keyword,) for keyword in keywords),
+        )
+        for keyword in keywords:
+            self.bloom.add(keyword)
+        return self._conn.total_changes - before
+
+    def close(self) -> None:
+        self._conn.close()
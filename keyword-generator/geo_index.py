@@ -0,0 +1,455 @@
+import argparse
+import csv
+import json
+import logging
+import math
+import mmap
+import struct
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+GAZETTEER_MAGIC = b"KGGZ"
+POI_MAGIC = b"KGPI"
+FORMAT_VERSION = 1
+HEADER_STRUCT = struct.Struct("<4sI")
+METERS_PER_DEGREE = 111320.0
+
+Ring = List[Tuple[float, float]]
+CoordRing = Tuple[Sequence[float], Sequence[float]]
+
+
+def distance_m(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
+    mean_lat = math.radians((lat1 + lat2) / 2)
+    dx = (lon2 - lon1) * math.cos(mean_lat) * METERS_PER_DEGREE
+    dy = (lat2 - lat1) * METERS_PER_DEGREE
+    return math.hypot(dx, dy)
+
+
+def cell_key(longitude: float, latitude: float, cell_deg: float) -> int:
+    return (math.floor(longitude / cell_deg) << 32) + math.floor(latitude / cell_deg)
+
+
+def write_index_file(path: Path, magic: bytes, meta: dict, arrays: Dict[str, array]) -> None:
+    """Write ``meta`` as a JSON header followed by 8-byte aligned raw arrays."""
+    layout = {}
+    offset = 0
+    for name, values in arrays.items():
+        layout[name] = [values.typecode, offset, len(values)]
+        offset += -(-len(values) * values.itemsize // 8) * 8
+    header = json.dumps({**meta, "version": FORMAT_VERSION, "arrays": layout}, ensure_ascii=False)
+    header_bytes = header.encode("utf-8")
+    header_bytes += b" " * (-(HEADER_STRUCT.size + len(header_bytes)) % 8)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("wb") as handle:
+        handle.write(HEADER_STRUCT.pack(magic, len(header_bytes)))
+        handle.write(header_bytes)
+        for values in arrays.values():
+            raw = values.tobytes()
+            handle.write(raw)
+            handle.write(b"\0" * (-len(raw) % 8))
+
+
+def open_index_file(path: Path, magic: bytes) -> Tuple[mmap.mmap, dict, Dict[str, memoryview]]:
+    with path.open("rb") as handle:
+        mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    found, header_len = HEADER_STRUCT.unpack_from(mapped, 0)
+    if found != magic:
+        raise ValueError(f"{path} is not a {magic.decode()} index")
+    meta = json.loads(mapped[HEADER_STRUCT.size : HEADER_STRUCT.size + header_len].decode("utf-8"))
+    if meta.get("version") != FORMAT_VERSION:
+        raise ValueError(f"{path} has unsupported index version {meta.get('version')}")
+    base = HEADER_STRUCT.size + header_len
+    view = memoryview(mapped)
+    arrays = {}
+    for name, (typecode, offset, count) in meta["arrays"].items():
+        size = array(typecode).itemsize
+        start = base + offset
+        arrays[name] = view[start : start + count * size].cast(typecode)
+    return mapped, meta, arrays
+
+
+def split_admin_name(full_name: str) -> Tuple[str, str, str, str]:
+    tokens = (full_name or "").split()
+    if not tokens:
+        return "", "", "", ""
+    area1, rest = tokens[0], tokens[1:]
+    area4 = ""
+    if len(rest) >= 2 and rest[-1].endswith("리"):
+        area4 = rest.pop()
+    area3 = rest.pop() if rest else ""
+    return area1, " ".join(rest), area3, area4
+
+
+def geometry_rings(geometry: dict) -> List[Ring]:
+    kind = (geometry or {}).get("type")
+    coordinates = (geometry or {}).get("coordinates") or []
+    if kind == "Polygon":
+        polygons = [coordinates]
+    elif kind == "MultiPolygon":
+        polygons = coordinates
+    else:
+        return []
+    rings = []
+    for polygon in polygons:
+        for ring in polygon:
+            points = [(float(point[0]), float(point[1])) for point in ring]
+            if len(points) > 1 and points[0] == points[-1]:
+                points.pop()
+            if len(points) >= 3:
+                rings.append(points)
+    return rings
+
+
+def rings_contain(rings: Iterable[CoordRing], longitude: float, latitude: float) -> bool:
+    inside = False
+    for xs, ys in rings:
+        x_prev, y_prev = xs[-1], ys[-1]
+        for x, y in zip(xs, ys):
+            if (y > latitude) != (y_prev > latitude):
+                if longitude < (x_prev - x) * (latitude - y) / (y_prev - y) + x:
+                    inside = not inside
+            x_prev, y_prev = x, y
+    return inside
+
+
+def edge_cells(rings: Sequence[Ring], cell_deg: float) -> set:
+    cells = set()
+    for ring in rings:
+        x_prev, y_prev = ring[-1]
+        for x, y in ring:
+            for ix in range(math.floor(min(x, x_prev) / cell_deg), math.floor(max(x, x_prev) / cell_deg) + 1):
+                for iy in range(math.floor(min(y, y_prev) / cell_deg), math.floor(max(y, y_prev) / cell_deg) + 1):
+                    cells.add((ix << 32) + iy)
+            x_prev, y_prev = x, y
+    return cells
+
+
+def import_gazetteer(source: Path, output: Path, name_property: str = "adm_nm", cell_deg: float = 0.005) -> int:
+    """Build a region gazetteer from a GeoJSON FeatureCollection of administrative boundaries.
+
+    Every grid cell records the features whose bounding box touches it. Cells that no boundary
+    edge passes through and whose centre lies inside a feature are marked as interior to it, so
+    most lookups resolve without a point-in-polygon test.
+    """
+    with source.open("r", encoding="utf-8") as handle:
+        collection = json.load(handle)
+
+    regions: List[Tuple[str, str, str, str]] = []
+    coords = array("f")
+    ring_offsets = array("I", [0])
+    feature_rings = array("I", [0])
+    bboxes = array("f")
+    cell_candidates: Dict[int, List[int]] = {}
+    cell_interior: Dict[int, int] = {}
+
+    for feature in collection.get("features", []):
+        name = (feature.get("properties") or {}).get(name_property)
+        rings = geometry_rings(feature.get("geometry"))
+        if not name or not rings:
+            continue
+        feature_id = len(regions)
+        regions.append(split_admin_name(name))
+        for ring in rings:
+            for x, y in ring:
+                coords.extend((x, y))
+            ring_offsets.append(len(coords) // 2)
+        feature_rings.append(len(ring_offsets) - 1)
+        xs = [x for ring in rings for x, _ in ring]
+        ys = [y for ring in rings for _, y in ring]
+        bboxes.extend((min(xs), min(ys), max(xs), max(ys)))
+
+        boundary = edge_cells(rings, cell_deg)
+        coord_rings = [([x for x, _ in ring], [y for _, y in ring]) for ring in rings]
+        for ix in range(math.floor(min(xs) / cell_deg), math.floor(max(xs) / cell_deg) + 1):
+            for iy in range(math.floor(min(ys) / cell_deg), math.floor(max(ys) / cell_deg) + 1):
+                key = (ix << 32) + iy
+                if key in boundary:
+                    cell_candidates.setdefault(key, []).append(feature_id)
+                elif rings_contain(coord_rings, (ix + 0.5) * cell_deg, (iy + 0.5) * cell_deg):
+                    cell_interior[key] = feature_id
+
+    cell_keys = array("q", sorted(set(cell_candidates) | set(cell_interior)))
+    cell_offsets = array("I", [0])
+    cell_members = array("I")
+    interior = array("i")
+    for key in cell_keys:
+        cell_members.extend(cell_candidates.get(key, []))
+        cell_offsets.append(len(cell_members))
+        interior.append(cell_interior.get(key, -1))
+
+    write_index_file(
+        output,
+        GAZETTEER_MAGIC,
+        {"cell_deg": cell_deg, "regions": regions},
+        {
+            "coords": coords,
+            "ring_offsets": ring_offsets,
+            "feature_rings": feature_rings,
+            "bboxes": bboxes,
+            "cell_keys": cell_keys,
+            "cell_offsets": cell_offsets,
+            "cell_members": cell_members,
+            "cell_interior": interior,
+        },
+    )
+    logger.info("Imported %s regions into %s (%s cells)", len(regions), output, len(cell_keys))
+    return len(regions)
+
+
+class RegionGazetteer:
+    def __init__(self, path: Path):
+        self.path = path
+        self._mmap, meta, arrays = open_index_file(path, GAZETTEER_MAGIC)
+        self.cell_deg = float(meta["cell_deg"])
+        self.regions = [tuple(region) for region in meta["regions"]]
+        self._coords = arrays["coords"]
+        self._ring_offsets = arrays["ring_offsets"]
+        self._feature_rings = arrays["feature_rings"]
+        self._bboxes = arrays["bboxes"]
+        self._cell_keys = arrays["cell_keys"]
+        self._cell_offsets = arrays["cell_offsets"]
+        self._cell_members = arrays["cell_members"]
+        self._cell_interior = arrays["cell_interior"]
+
+    def __len__(self) -> int:
+        return len(self.regions)
+
+    def _contains(self, feature_id: int, longitude: float, latitude: float) -> bool:
+        min_x, min_y, max_x, max_y = self._bboxes[feature_id * 4 : feature_id * 4 + 4]
+        if not (min_x <= longitude <= max_x and min_y <= latitude <= max_y):
+            return False
+        coords = self._coords
+        rings = []
+        for ring in range(self._feature_rings[feature_id], self._feature_rings[feature_id + 1]):
+            start, end = self._ring_offsets[ring] * 2, self._ring_offsets[ring + 1] * 2
+            rings.append((coords[start:end:2], coords[start + 1 : end : 2]))
+        return rings_contain(rings, longitude, latitude)
+
+    def locate(self, longitude: float, latitude: float) -> Optional[Tuple[str, str, str, str]]:
+        key = cell_key(longitude, latitude, self.cell_deg)
+        pos = bisect_left(self._cell_keys, key)
+        if pos == len(self._cell_keys) or self._cell_keys[pos] != key:
+            return None
+        for feature_id in self._cell_members[self._cell_offsets[pos] : self._cell_offsets[pos + 1]]:
+            if self._contains(feature_id, longitude, latitude):
+                return self.regions[feature_id]
+        interior = self._cell_interior[pos]
+        if interior >= 0:
+            return self.regions[interior]
+        return None
+
+    def reverse_geocode(self, longitude: float, latitude: float) -> Optional[dict]:
+        """Answer in the shape of the Maps reverse-geocode response consumed by extract_region_keywords."""
+        region = self.locate(longitude, latitude)
+        if not region:
+            return None
+        names = {f"area{level}": {"name": name} for level, name in enumerate(region, start=1)}
+        return {"results": [{"name": "gazetteer", "region": {"area0": {"name": "kr"}, **names}}]}
+
+
+def load_gazetteer(path: Optional[Path]) -> Optional[RegionGazetteer]:
+    if not path:
+        return None
+    if not path.exists():
+        logger.info("Region gazetteer %s not found; using the reverse geocode API", path)
+        return None
+    return RegionGazetteer(path)
+
+
+def import_pois(
+    sources: Sequence[Tuple[str, Path]],
+    output: Path,
+    name_column: str = "name",
+    category_column: str = "category",
+    lon_column: str = "longitude",
+    lat_column: str = "latitude",
+    default_category: str = "",
+    encoding: str = "utf-8-sig",
+    cell_deg: float = 0.01,
+) -> int:
+    """Build a POI index from ``(kind, csv_path)`` sources such as station lists or landmark registries."""
+    kinds: List[str] = []
+    names: List[str] = []
+    categories: List[str] = []
+    coords = array("f")
+    kind_ids = array("B")
+    cells: Dict[int, List[int]] = {}
+    seen = set()
+
+    for kind, path in sources:
+        if kind not in kinds:
+            kinds.append(kind)
+        with path.open("r", encoding=encoding, newline="") as handle:
+            for row in csv.DictReader(handle):
+                name = (row.get(name_column) or "").strip()
+                try:
+                    longitude = float(row.get(lon_column) or "")
+                    latitude = float(row.get(lat_column) or "")
+                except ValueError:
+                    continue
+                if not name or (kind, name, round(longitude, 4), round(latitude, 4)) in seen:
+                    continue
+                seen.add((kind, name, round(longitude, 4), round(latitude, 4)))
+                poi_id = len(names)
+                names.append(name)
+                categories.append((row.get(category_column) or "").strip() or default_category)
+                coords.extend((longitude, latitude))
+                kind_ids.append(kinds.index(kind))
+                cells.setdefault(cell_key(longitude, latitude, cell_deg), []).append(poi_id)
+
+    cell_keys = array("q", sorted(cells))
+    cell_offsets = array("I", [0])
+    cell_members = array("I")
+    for key in cell_keys:
+        cell_members.extend(cells[key])
+        cell_offsets.append(len(cell_members))
+
+    write_index_file(
+        output,
+        POI_MAGIC,
+        {"cell_deg": cell_deg, "kinds": kinds, "names": names, "categories": categories},
+        {
+            "coords": coords,
+            "kind_ids": kind_ids,
+            "cell_keys": cell_keys,
+            "cell_offsets": cell_offsets,
+            "cell_members": cell_members,
+        },
+    )
+    logger.info("Imported %s POIs (%s) into %s", len(names), ", ".join(kinds), output)
+    return len(names)
+
+
+class PoiIndex:
+    def __init__(self, path: Path):
+        self.path = path
+        self._mmap, meta, arrays = open_index_file(path, POI_MAGIC)
+        self.cell_deg = float(meta["cell_deg"])
+        self.kinds = list(meta["kinds"])
+        self.names = meta["names"]
+        self.categories = meta["categories"]
+        self._coords = arrays["coords"]
+        self._kind_ids = arrays["kind_ids"]
+        self._cell_keys = arrays["cell_keys"]
+        self._cell_offsets = arrays["cell_offsets"]
+        self._cell_members = arrays["cell_members"]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def has_kind(self, kind: str) -> bool:
+        return kind in self.kinds
+
+    def search(
+        self,
+        longitude: float,
+        latitude: float,
+        radius_m: float,
+        kind: str,
+        limit: Optional[int] = None,
+    ) -> List[dict]:
+        """Return POIs of ``kind`` within ``radius_m``, nearest first, as Local-API style items."""
+        if kind not in self.kinds:
+            return []
+        kind_id = self.kinds.index(kind)
+        lat_delta = radius_m / METERS_PER_DEGREE
+        lon_delta = lat_delta / max(math.cos(math.radians(latitude)), 1e-6)
+        found = []
+        for ix in range(
+            math.floor((longitude - lon_delta) / self.cell_deg),
+            math.floor((longitude + lon_delta) / self.cell_deg) + 1,
+        ):
+            for iy in range(
+                math.floor((latitude - lat_delta) / self.cell_deg),
+                math.floor((latitude + lat_delta) / self.cell_deg) + 1,
+            ):
+                key = (ix << 32) + iy
+                pos = bisect_left(self._cell_keys, key)
+                if pos == len(self._cell_keys) or self._cell_keys[pos] != key:
+                    continue
+                for poi_id in self._cell_members[self._cell_offsets[pos] : self._cell_offsets[pos + 1]]:
+                    if self._kind_ids[poi_id] != kind_id:
+                        continue
+                    poi_lon, poi_lat = self._coords[poi_id * 2], self._coords[poi_id * 2 + 1]
+                    distance = distance_m(longitude, latitude, poi_lon, poi_lat)
+                    if distance <= radius_m:
+                        found.append((distance, poi_id))
+        found.sort()
+        return [
+            {"name": self.names[poi_id], "category": self.categories[poi_id], "distance": round(distance)}
+            for distance, poi_id in found[:limit]
+        ]
+
+
+def load_poi_index(path: Optional[Path]) -> Optional[PoiIndex]:
+    if not path:
+        return None
+    if not path.exists():
+        logger.info("POI index %s not found; using the search APIs", path)
+        return None
+    return PoiIndex(path)
+
+
+def parse_source(value: str) -> Tuple[str, Path]:
+    kind, sep, path = value.partition("=")
+    if not sep or not kind or not path:
+        raise argparse.ArgumentTypeError(f"expected KIND=PATH, got {value!r}")
+    return kind, Path(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build offline spatial indexes for the keyword generator")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    regions = subparsers.add_parser("regions", help="Import administrative boundaries (GeoJSON)")
+    regions.add_argument("--source", required=True, help="GeoJSON FeatureCollection of 읍/면/동 boundaries")
+    regions.add_argument("--output", default="data/gazetteer.kgz", help="Index file to write")
+    regions.add_argument("--name-property", default="adm_nm", help="Property holding the full region name")
+    regions.add_argument("--cell-deg", type=float, default=0.005, help="Grid cell size in degrees")
+
+    pois = subparsers.add_parser("pois", help="Import POI lists (CSV) such as stations or landmarks")
+    pois.add_argument(
+        "--source",
+        required=True,
+        action="append",
+        type=parse_source,
+        help="KIND=PATH, e.g. subway=data/stations.csv (repeatable)",
+    )
+    pois.add_argument("--output", default="data/poi_index.kgp", help="Index file to write")
+    pois.add_argument("--name-column", default="name")
+    pois.add_argument("--category-column", default="category")
+    pois.add_argument("--lon-column", default="longitude")
+    pois.add_argument("--lat-column", default="latitude")
+    pois.add_argument("--default-category", default="", help="Category for rows without one")
+    pois.add_argument("--encoding", default="utf-8-sig")
+    pois.add_argument("--cell-deg", type=float, default=0.01, help="Grid cell size in degrees")
+
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level, format="%(levelname)s: %(message)s")
+
+    if args.command == "regions":
+        import_gazetteer(Path(args.source), Path(args.output), args.name_property, args.cell_deg)
+    elif args.command == "pois":
+        import_pois(
+            args.source,
+            Path(args.output),
+            name_column=args.name_column,
+            category_column=args.category_column,
+            lon_column=args.lon_column,
+            lat_column=args.lat_column,
+            default_category=args.default_category,
+            encoding=args.encoding,
+            cell_deg=args.cell_deg,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import json
+import zipfile
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from main import (
+    export_keywords,
+    generate_keywords_from_components,
+    load_config,
+    open_export_index,
+    prepare_delta,
+    run_pipeline,
+)
+
+
+# CPU-heavy web jobs. They run in the web app's worker processes, so they take and return only
+# picklable values and exchange files through ``work_dir``.
+
+
+def report_progress(path: Optional[Path], stage: str, **values) -> None:
+    if path is None:
+        return
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps({"stage": stage, **values}), encoding="utf-8")
+    tmp_path.replace(path)
+
+
+def read_progress(path: Path) -> Optional[dict]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def write_zip(
+    output_dir: Path,
+    zip_path: Path,
+    extra_paths: Iterable[Path] = (),
+    delta: Optional[dict] = None,
+) -> Path:
+    # Once the account has a previous export for these groups, the zip holds only the delta package.
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        if delta and delta["previous_total"]:
+            for path in sorted(delta["dir"].iterdir()):
+                zip_file.write(path, arcname=f"{delta['dir'].name}/{path.name}")
+        else:
+            for csv_path in sorted(output_dir.glob("*.csv")):
+                zip_file.write(csv_path, arcname=csv_path.name)
+        for path in extra_paths:
+            zip_file.write(path, arcname=path.name)
+    return zip_path
+
+
+def generate_job(work_dir: Path, **pipeline_args) -> dict:
+    output_dir = work_dir / "output"
+    result = run_pipeline(output_dir=output_dir, **pipeline_args)
+    profile_files = (result.get("profile") or {}).get("files", {}).values()
+    result["zip_path"] = write_zip(output_dir, work_dir / "export.zip", profile_files, result.get("delta"))
+    return result
+
+
+def regenerate_job(
+    work_dir: Path,
+    config_path: Path,
+    region_terms: List[str],
+    service_terms: List[str],
+    modifier_terms: List[str],
+    poi_terms: List[str],
+    pattern_list: List[List[str]],
+    ad_group_ids: List[str],
+    keywords_per_group: int,
+    account: Optional[str],
+    progress_path: Optional[Path] = None,
+) -> dict:
+    config = load_config(config_path)
+    exported_index = open_export_index(config, account)
+    previous = prepare_delta(exported_index, ad_group_ids, config)
+    report_progress(progress_path, "generating", combinations=0)
+    try:
+        keyword_rank = generate_keywords_from_components(
+            region_terms,
+            service_terms,
+            modifier_terms,
+            poi_terms,
+            pattern_list,
+            config,
+            exported_index,
+            lambda combinations: report_progress(progress_path, "generating", combinations=combinations),
+        )
+    finally:
+        if exported_index is not None:
+            exported_index.close()
+
+    target_total = len(ad_group_ids) * keywords_per_group
+    output_dir = work_dir / "output"
+    report_progress(progress_path, "ranking", keywords=len(keyword_rank))
+    export = export_keywords(
+        output_dir,
+        work_dir / "keywords.kga",
+        keyword_rank,
+        ad_group_ids,
+        keywords_per_group,
+        config,
+        previous,
+        account,
+    )
+    generated_total = export["generated_total"]
+    report_progress(progress_path, "zipping", keywords=generated_total)
+    return {
+        "artifact_path": export["artifact_path"],
+        "zip_path": write_zip(output_dir, work_dir / "export.zip", delta=export["delta"]),
+        "group_offsets": export["group_offsets"],
+        "group_order": export["group_order"],
+        "delta": export["delta"],
+        "generated_total": generated_total,
+        "target_total": target_total,
+        "shortfall": max(0, target_total - generated_total),
+    }
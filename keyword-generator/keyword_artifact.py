@@ -0,0 +1,127 @@
+import mmap
+import struct
+from array import array
+from pathlib import Path
+from typing import Iterable, Iterator, List, Sequence, Tuple, Union
+
+
+ARTIFACT_MAGIC = b"KGKA"
+ARTIFACT_VERSION = 1
+# magic, version, keyword count, byte offset of the offsets array, byte offset of the rank array
+ARTIFACT_HEADER = struct.Struct("<4sIQQQ")
+SEPARATOR = b"\n"
+
+
+class KeywordArtifactWriter:
+    """Stream ranked keywords into an artifact file.
+
+    Layout: header, UTF-8 blob (each keyword followed by a newline), uint64 offsets into the blob
+    (count + 1 entries) and one uint8 rank per keyword. Only the offsets and ranks are kept in
+    memory while writing.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._handle = path.open("wb")
+        self._handle.write(b"\0" * ARTIFACT_HEADER.size)
+        self._offsets = array("Q", [0])
+        self._ranks = array("B")
+
+    def __enter__(self) -> "KeywordArtifactWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._ranks)
+
+    def add(self, keyword: str, rank: int) -> None:
+        data = keyword.encode("utf-8") + SEPARATOR
+        self._handle.write(data)
+        self._offsets.append(self._offsets[-1] + len(data))
+        self._ranks.append(min(rank, 255))
+
+    def extend(self, items: Iterable[Tuple[str, int]]) -> None:
+        for keyword, rank in items:
+            self.add(keyword, rank)
+
+    def close(self) -> None:
+        if self._handle.closed:
+            return
+        blob_end = ARTIFACT_HEADER.size + self._offsets[-1]
+        self._handle.write(b"\0" * (-blob_end % 8))
+        offsets_at = blob_end + (-blob_end % 8)
+        self._handle.write(self._offsets.tobytes())
+        ranks_at = offsets_at + len(self._offsets) * self._offsets.itemsize
+        self._handle.write(self._ranks.tobytes())
+        self._handle.seek(0)
+        self._handle.write(
+            ARTIFACT_HEADER.pack(ARTIFACT_MAGIC, ARTIFACT_VERSION, len(self._ranks), offsets_at, ranks_at)
+        )
+        self._handle.close()
+
+
+def write_keyword_artifact(path: Path, ranked: Iterable[Tuple[str, int]]) -> Path:
+    with KeywordArtifactWriter(path) as writer:
+        writer.extend(ranked)
+    return path
+
+
+class KeywordArtifact(Sequence[str]):
+    """Read-only view of a keyword artifact; slices decode only the requested range."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with path.open("rb") as handle:
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, offsets_at, ranks_at = ARTIFACT_HEADER.unpack_from(self._mmap, 0)
+        if magic != ARTIFACT_MAGIC or version != ARTIFACT_VERSION:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a keyword artifact")
+        self._count = count
+        self._view = view = memoryview(self._mmap)
+        self._offsets = view[offsets_at : offsets_at + (count + 1) * 8].cast("Q")
+        self._ranks = view[ranks_at : ranks_at + count]
+        self._blob = view[ARTIFACT_HEADER.size : ARTIFACT_HEADER.size + self._offsets[count]]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._count)
+            if step != 1:
+                return [self[position] for position in range(start, stop, step)]
+            return self.page(start, stop)
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("keyword index out of range")
+        return self._blob[self._offsets[index] : self._offsets[index + 1] - 1].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for start in range(0, self._count, 4096):
+            yield from self.page(start, start + 4096)
+
+    def page(self, start: int, stop: int) -> List[str]:
+        stop = min(stop, self._count)
+        if start >= stop:
+            return []
+        base = self._offsets[start]
+        raw = self._blob[base : self._offsets[stop]].tobytes()
+        keywords = raw.decode("utf-8").split("\n")[:-1]
+        if len(keywords) == stop - start:
+            return keywords
+        # A keyword contains a newline: fall back to the offsets.
+        offsets = self._offsets[start : stop + 1]
+        return [
+            raw[offsets[i] - base : offsets[i + 1] - base - 1].decode("utf-8") for i in range(stop - start)
+        ]
+
+    def close(self) -> None:
+        for view in (self._blob, self._offsets, self._ranks, self._view):
+            view.release()
+        self._mmap.close()
+
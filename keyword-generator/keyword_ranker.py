@@ -0,0 +1,166 @@
+import heapq
+import logging
+import re
+import shutil
+import tempfile
+from itertools import groupby
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+MERGE_FAN_IN = 64
+Record = Tuple[str, int]
+ESCAPED = re.compile(r"\\(.)", re.DOTALL)
+
+
+def rank_key(record: Record) -> Tuple[int, int, str]:
+    keyword, rank = record
+    return rank, len(keyword), keyword
+
+
+def keyword_key(record: Record) -> str:
+    return record[0]
+
+
+def escape_keyword(keyword: str) -> str:
+    return keyword.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def unescape_keyword(text: str) -> str:
+    if "\\" not in text:
+        return text
+    return ESCAPED.sub(lambda match: "\n" if match.group(1) == "n" else match.group(1), text)
+
+
+def write_run(path: Path, records: Iterable[Record]) -> Path:
+    # One "rank<TAB>keyword" line per record; newlines inside keywords are escaped.
+    with path.open("w", encoding="utf-8", newline="\n") as handle:
+        for keyword, rank in records:
+            handle.write(f"{rank}\t{escape_keyword(keyword)}\n")
+    return path
+
+
+def read_run(path: Path) -> Iterator[Record]:
+    with path.open("r", encoding="utf-8", newline="\n") as handle:
+        for line in handle:
+            rank, keyword = line.rstrip("\n").split("\t", 1)
+            yield unescape_keyword(keyword), int(rank)
+
+
+def dedup_sorted(records: Iterable[Record]) -> Iterator[Record]:
+    """Collapse keyword-sorted records to one per keyword with the lowest rank."""
+    for keyword, group in groupby(records, key=keyword_key):
+        yield keyword, min(rank for _, rank in group)
+
+
+class KeywordRanker:
+    """Keyword -> lowest pattern rank, ordered by (rank, length, keyword).
+
+    Below ``spill_threshold`` distinct keywords everything stays in a dict. Above it the dict is
+    written out as a keyword-sorted run and cleared. ``ranked`` then k-way merges the runs, keeping
+    the lowest rank per keyword, re-sorts the unique records by rank in threshold-sized runs and
+    merges those, so memory stays bounded by the threshold regardless of job size.
+    """
+
+    def __init__(self, spill_threshold: int = 0, spill_dir: Optional[Path] = None):
+        self.spill_threshold = spill_threshold
+        self.spill_dir = spill_dir
+        self._ranks: Dict[str, int] = {}
+        self._runs: List[Path] = []
+        self._tmp_dir: Optional[Path] = None
+        self._count: Optional[int] = None
+        self._ranked_runs: List[Path] = []
+        self._run_number = 0
+
+    def __enter__(self) -> "KeywordRanker":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        self.close()
+
+    def __contains__(self, keyword: str) -> bool:
+        # Only the in-memory part; a keyword already spilled is merged again during ranking.
+        return keyword in self._ranks
+
+    def add(self, keyword: str, rank: int) -> None:
+        if self._count is not None:
+            raise RuntimeError("KeywordRanker is already finalized")
+        current = self._ranks.get(keyword)
+        if current is None or current > rank:
+            self._ranks[keyword] = rank
+            if self.spill_threshold > 0 and len(self._ranks) >= self.spill_threshold:
+                self._spill()
+
+    def _new_run_path(self) -> Path:
+        if self._tmp_dir is None:
+            if self.spill_dir is not None:
+                self.spill_dir.mkdir(parents=True, exist_ok=True)
+            self._tmp_dir = Path(tempfile.mkdtemp(prefix="keyword_ranker_", dir=self.spill_dir))
+        self._run_number += 1
+        return self._tmp_dir / f"run_{self._run_number:05d}.tsv"
+
+    def _spill(self) -> None:
+        path = write_run(self._new_run_path(), sorted(self._ranks.items()))
+        self._runs.append(path)
+        logger.info("Spilled %s keywords to %s", len(self._ranks), path.name)
+        self._ranks = {}
+
+    def _merge(self, paths: List[Path], key: Callable, dedup: bool) -> Iterator[Record]:
+        merged = heapq.merge(*(read_run(path) for path in paths), key=key)
+        return dedup_sorted(merged) if dedup else merged
+
+    def _reduce(self, paths: List[Path], key: Callable, dedup: bool) -> List[Path]:
+        # Merge runs in batches until a single merge needs at most MERGE_FAN_IN open files.
+        while len(paths) > MERGE_FAN_IN:
+            head, paths = paths[:MERGE_FAN_IN], paths[MERGE_FAN_IN:]
+            paths.append(write_run(self._new_run_path(), self._merge(head, key, dedup)))
+            for path in head:
+                path.unlink()
+        return paths
+
+    def _finalize(self) -> None:
+        if self._count is not None:
+            return
+        if not self._runs:
+            self._count = len(self._ranks)
+            return
+        if self._ranks:
+            self._spill()
+        count = 0
+        chunk: List[Record] = []
+        self._runs = self._reduce(self._runs, keyword_key, dedup=True)
+        for record in self._merge(self._runs, keyword_key, dedup=True):
+            count += 1
+            chunk.append(record)
+            if len(chunk) >= self.spill_threshold:
+                chunk.sort(key=rank_key)
+                self._ranked_runs.append(write_run(self._new_run_path(), chunk))
+                chunk = []
+        if chunk:
+            chunk.sort(key=rank_key)
+            self._ranked_runs.append(write_run(self._new_run_path(), chunk))
+        for path in self._runs:
+            path.unlink(missing_ok=True)
+        self._runs = []
+        self._ranked_runs = self._reduce(self._ranked_runs, rank_key, dedup=False)
+        self._count = count
+
+    def __len__(self) -> int:
+        self._finalize()
+        return self._count or 0
+
+    def ranked(self) -> Iterator[Record]:
+        """(keyword, rank) pairs ordered by rank, then keyword length, then keyword."""
+        self._finalize()
+        if not self._ranked_runs:
+            return iter(sorted(self._ranks.items(), key=rank_key))
+        return self._merge(self._ranked_runs, rank_key, dedup=False)
+
+    def close(self) -> None:
+        if self._tmp_dir is not None:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+            self._tmp_dir = None
+        self._ranks = {}
@@ -0,0 +1,123 @@
+import bisect
+import math
+import random
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+
+class PatternSpace:
+    """One pattern's cartesian product as a mixed-radix index space.
+
+    Index ``i`` decodes to the same term tuple ``itertools.product`` yields at position ``i``: the
+    last part is the fastest-changing digit.
+    """
+
+    def __init__(self, pattern: Sequence[str], parts: Sequence[Sequence[str]]):
+        self.pattern = list(pattern)
+        self.parts = [list(part) for part in parts]
+        self.size = math.prod(len(part) for part in self.parts) if self.parts else 0
+
+    def decode(self, index: int) -> Tuple[str, ...]:
+        terms: List[str] = []
+        for part in reversed(self.parts):
+            index, digit = divmod(index, len(part))
+            terms.append(part[digit])
+        return tuple(reversed(terms))
+
+
+class KeywordSampler:
+    """Draws keywords from several patterns' products without enumerating them.
+
+    ``uniform`` draws from the union of all index spaces, so patterns appear in proportion to their
+    size; ``stratified`` splits the sample evenly across patterns. Draws rejected by ``accept`` or
+    repeating an earlier keyword are skipped; ``max_draws_factor`` bounds the draws per requested
+    keyword so heavily filtered spaces still return quickly.
+    """
+
+    def __init__(
+        self,
+        patterns: Sequence[Sequence[str]],
+        columns: Dict[str, Sequence[str]],
+        joiner: str = "",
+        accept: Optional[Callable[[str], bool]] = None,
+        max_draws_factor: int = 20,
+    ):
+        self.spaces = [PatternSpace(pattern, [columns.get(key, []) for key in pattern]) for pattern in patterns]
+        self.joiner = joiner
+        self.accept = accept
+        self.max_draws_factor = max_draws_factor
+        self._bounds: List[int] = []
+        total = 0
+        for space in self.spaces:
+            total += space.size
+            self._bounds.append(total)
+        self.total = total
+
+    def sample(self, size: int, mode: str = "uniform", seed: Optional[int] = None) -> dict:
+        """``size`` distinct accepted keywords, plus per-pattern draw statistics.
+
+        ``estimated_keywords`` scales a pattern's combination count by the share of its draws that
+        passed ``accept``; it does not account for keywords shared with other patterns.
+        """
+        rng = random.Random(seed)
+        stats = [{"drawn": 0, "excluded": 0} for _ in self.spaces]
+        keywords: List[dict] = []
+        seen: Set[str] = set()
+        if mode == "stratified":
+            nonempty = [space_id for space_id, space in enumerate(self.spaces) if space.size]
+            for position, space_id in enumerate(nonempty):
+                quota = size // len(nonempty) + (1 if position < size % len(nonempty) else 0)
+                self._draw(rng, space_id, quota, keywords, seen, stats)
+        else:
+            self._draw(rng, None, size, keywords, seen, stats)
+
+        patterns = []
+        for space, stat in zip(self.spaces, stats):
+            estimate = None
+            if stat["drawn"]:
+                estimate = round(space.size * (stat["drawn"] - stat["excluded"]) / stat["drawn"])
+            patterns.append(
+                {
+                    "pattern": space.pattern,
+                    "combinations": space.size,
+                    "drawn": stat["drawn"],
+                    "excluded": stat["excluded"],
+                    "estimated_keywords": estimate,
+                }
+            )
+        return {"keywords": keywords, "patterns": patterns, "total_combinations": self.total}
+
+    def _draw(
+        self,
+        rng: random.Random,
+        space_id: Optional[int],
+        quota: int,
+        keywords: List[dict],
+        seen: Set[str],
+        stats: List[dict],
+    ) -> None:
+        # space_id None draws from the union of all spaces.
+        population = self.total if space_id is None else self.spaces[space_id].size
+        max_draws = min(population, max(quota, 1) * self.max_draws_factor)
+        drawn: Set[int] = set()
+        accepted = 0
+        while accepted < quota and len(drawn) < max_draws:
+            index = rng.randrange(population)
+            if index in drawn:
+                continue
+            drawn.add(index)
+            if space_id is None:
+                index_space = bisect.bisect_right(self._bounds, index)
+                offset = index - (self._bounds[index_space - 1] if index_space else 0)
+            else:
+                index_space, offset = space_id, index
+            space = self.spaces[index_space]
+            stats[index_space]["drawn"] += 1
+            keyword = self.joiner.join(space.decode(offset))
+            if self.accept is not None and not self.accept(keyword):
+                stats[index_space]["excluded"] += 1
+                continue
+            if keyword in seen:
+                continue
+            seen.add(keyword)
+            accepted += 1
+            keywords.append({"keyword": keyword, "pattern": space.pattern, "rank": len(space.pattern)})
@@ -1,25 +1,83 @@
 import argparse
+import copy
 import csv
+import io
 import json
 import logging
+import math
 import os
 import re
 import time
+from array import array
 from dataclasses import dataclass
-from itertools import product
+from itertools import islice, product
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from typing import Callable, Container, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
 
 import requests
 import yaml
 from dotenv import load_dotenv
 
+from api_budget import DEFAULT_DEGRADE_ORDER, ApiBudget, ApiBudgetExceeded
+from cli_args import build_arg_parser, print_result
+from export_index import ExportedKeywordIndex
+from geo_index import (
+    METERS_PER_DEGREE,
+    PoiIndex,
+    RegionGazetteer,
+    distance_m,
+    load_gazetteer,
+    load_poi_index,
+)
+from keyword_artifact import KeywordArtifact, write_keyword_artifact
+from keyword_ranker import KeywordRanker
+from keyword_sampler import KeywordSampler
+from profiling import StageProfiler
+from term_matcher import CompiledRules, TermAutomaton
+
 
 logger = logging.getLogger(__name__)
+BASE_DIR = Path(__file__).resolve().parent
 
 
 DELIM_RE = re.compile(r"[,\|/]+")
 TAG_RE = re.compile(r"<[^>]+>")
+REQUIRED_INPUT_COLUMNS = ("상호명", "주소(도로명)", "주요서비스")
+AD_GROUP_ID_COLUMN = "ad_group_id"
+PROGRESS_EVERY = 100000
+BRACKET_RE = re.compile(r"\([^)]*\)|\[[^\]]*\]")
+ROAD_ADDRESS_RE = re.compile(r"^(.*?\S(?:로|길) \d+(?:-\d+)?)(?=$|\s)")
+ROAD_JOIN_RE = re.compile(r"(\S로) (\d+번?길)")
+ROAD_NUMBER_RE = re.compile(r"(\S(?:로|길))(\d+(?:-\d+)?)(?=$|\s)")
+PROVINCE_ALIASES = {
+    "서울특별시": "서울",
+    "서울시": "서울",
+    "부산광역시": "부산",
+    "부산시": "부산",
+    "대구광역시": "대구",
+    "대구시": "대구",
+    "인천광역시": "인천",
+    "인천시": "인천",
+    "광주광역시": "광주",
+    "대전광역시": "대전",
+    "대전시": "대전",
+    "울산광역시": "울산",
+    "울산시": "울산",
+    "세종특별자치시": "세종",
+    "세종시": "세종",
+    "경기도": "경기",
+    "강원특별자치도": "강원",
+    "강원도": "강원",
+    "충청북도": "충북",
+    "충청남도": "충남",
+    "전북특별자치도": "전북",
+    "전라북도": "전북",
+    "전라남도": "전남",
+    "경상북도": "경북",
+    "경상남도": "경남",
+    "제주특별자치도": "제주",
+    "제주도": "제주",
+}
 
 
 @dataclass
@@ -34,13 +92,92 @@ class BusinessContext:
     latitude: float
 
 
+class ReverseGeocodeCache:
+    """Reverse-geocode results shared by points within ``verify_distance_m`` of a grid cell's sample."""
+
+    def __init__(self, grid_m: float, verify_distance_m: float):
+        self.grid_m = grid_m
+        self.verify_distance_m = verify_distance_m
+        self.hits = 0
+        self.misses = 0
+        self._cells: Dict[Tuple[int, int], dict] = {}
+        self._exact: Dict[Tuple[float, float], dict] = {}
+
+    def cell_key(self, longitude: float, latitude: float) -> Tuple[int, int]:
+        lat_step = self.grid_m / METERS_PER_DEGREE
+        row = math.floor(latitude / lat_step)
+        row_latitude = (row + 0.5) * lat_step
+        lon_step = lat_step / max(math.cos(math.radians(row_latitude)), 1e-6)
+        return row, math.floor(longitude / lon_step)
+
+    def _exact_lookup(
+        self,
+        longitude: float,
+        latitude: float,
+        fetch: Callable[[float, float], Optional[dict]],
+    ) -> Optional[dict]:
+        key = (longitude, latitude)
+        if key in self._exact:
+            self.hits += 1
+            return self._exact[key]
+        self.misses += 1
+        data = fetch(longitude, latitude)
+        if data is not None:
+            self._exact[key] = data
+        return data
+
+    def lookup(
+        self,
+        longitude: float,
+        latitude: float,
+        fetch: Callable[[float, float], Optional[dict]],
+    ) -> Optional[dict]:
+        if self.grid_m <= 0:
+            return self._exact_lookup(longitude, latitude, fetch)
+
+        key = self.cell_key(longitude, latitude)
+        cell = self._cells.get(key)
+        if cell is None:
+            data = self._exact_lookup(longitude, latitude, fetch)
+            if data is not None:
+                self._cells[key] = {"data": data, "origin": (longitude, latitude)}
+            return data
+        origin_lon, origin_lat = cell["origin"]
+        if distance_m(origin_lon, origin_lat, longitude, latitude) <= self.verify_distance_m:
+            self.hits += 1
+            return cell["data"]
+        # Farther points may sit across an admin boundary, so they are always looked up themselves.
+        return self._exact_lookup(longitude, latitude, fetch)
+
+    def cached(self, longitude: float, latitude: float) -> bool:
+        if (longitude, latitude) in self._exact:
+            return True
+        cell = self._cells.get(self.cell_key(longitude, latitude)) if self.grid_m > 0 else None
+        if cell is None:
+            return False
+        origin_lon, origin_lat = cell["origin"]
+        return distance_m(origin_lon, origin_lat, longitude, latitude) <= self.verify_distance_m
+
+
 class NaverMapsClient:
-    def __init__(self, client_id: str, client_secret: str, base_url: str, delay_sec: float):
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        base_url: str,
+        delay_sec: float,
+        budget: Optional[ApiBudget] = None,
+    ):
         self.client_id = client_id
         self.client_secret = client_secret
         self.base_url = base_url.rstrip("/")
         self.delay_sec = delay_sec
+        self.budget = budget
         self._session = requests.Session()
+        self._responses: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], dict] = {}
+
+    def clear_cache(self) -> None:
+        self._responses.clear()
 
     def _headers(self) -> Dict[str, str]:
         return {
@@ -48,7 +185,19 @@ class NaverMapsClient:
             "X-NCP-APIGW-API-KEY": self.client_secret,
         }
 
-    def _get(self, path: str, params: Dict[str, str]) -> Optional[dict]:
+    def _get(self, api: str, path: str, params: Dict[str, str]) -> Optional[dict]:
+        key = (path, tuple(sorted(params.items())))
+        data = self._responses.get(key)
+        if data is None:
+            if self.budget is not None:
+                self.budget.charge(api)
+            data = self._request(path, params)
+            # Failures (HTTP errors, non-JSON) are retried by the next request instead of cached.
+            if data is not None:
+                self._responses[key] = data
+        return data
+
+    def _request(self, path: str, params: Dict[str, str]) -> Optional[dict]:
         url = f"{self.base_url}{path}"
         response = self._session.get(url, headers=self._headers(), params=params, timeout=15)
         if self.delay_sec > 0:
@@ -63,7 +212,7 @@ class NaverMapsClient:
             return None
 
     def geocode(self, address: str) -> Optional[Tuple[float, float]]:
-        data = self._get("/map-geocode/v2/geocode", {"query": address})
+        data = self._get("geocode", "/map-geocode/v2/geocode", {"query": address})
         if not data or not data.get("addresses"):
             return None
         first = data["addresses"][0]
@@ -78,7 +227,7 @@ class NaverMapsClient:
             "output": "json",
             "orders": "addr,roadaddr",
         }
-        return self._get("/map-reversegeocode/v2/gc", params)
+        return self._get("reverse_geocode", "/map-reversegeocode/v2/gc", params)
 
     def search_place(
         self,
@@ -97,16 +246,28 @@ class NaverMapsClient:
             "size": str(size),
             "sort": "distance",
         }
-        return self._get("/map-place/v1/search", params)
+        return self._get("search_place", "/map-place/v1/search", params)
 
 
 class NaverLocalClient:
-    def __init__(self, client_id: str, client_secret: str, base_url: str, delay_sec: float):
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        base_url: str,
+        delay_sec: float,
+        budget: Optional[ApiBudget] = None,
+    ):
         self.client_id = client_id
         self.client_secret = client_secret
         self.base_url = base_url.rstrip("/")
         self.delay_sec = delay_sec
+        self.budget = budget
         self._session = requests.Session()
+        self._responses: Dict[Tuple[str, int], dict] = {}
+
+    def clear_cache(self) -> None:
+        self._responses.clear()
 
     def _headers(self) -> Dict[str, str]:
         return {
@@ -115,6 +276,17 @@ class NaverLocalClient:
         }
 
     def search_local(self, query: str, display: int = 5) -> Optional[dict]:
+        key = (query, display)
+        data = self._responses.get(key)
+        if data is None:
+            if self.budget is not None:
+                self.budget.charge("search_local")
+            data = self._request(query, display)
+            if data is not None:
+                self._responses[key] = data
+        return data
+
+    def _request(self, query: str, display: int) -> Optional[dict]:
         url = f"{self.base_url}/v1/search/local.json"
         params = {"query": query, "display": str(display), "start": "1", "sort": "sim"}
         response = self._session.get(url, headers=self._headers(), params=params, timeout=15)
@@ -135,6 +307,136 @@ def load_config(path: Path) -> dict:
         return yaml.safe_load(handle)
 
 
+class PipelineRuntime:
+    """Configs, API clients, caches and offline indexes kept warm between runs (used by the daemon)."""
+
+    def __init__(self, env_path: Path, cache_ttl_sec: float = 0):
+        load_dotenv(env_path)
+        self.cache_ttl_sec = cache_ttl_sec
+        self._configs: Dict[Path, Tuple[float, dict, CompiledRules]] = {}
+        self._indexes: Dict[Tuple[str, Path], Tuple[float, object]] = {}
+        self._clients: Dict[tuple, object] = {}
+        self._reverse_caches: Dict[Tuple[float, float], ReverseGeocodeCache] = {}
+        self.geocode_cache: Dict[str, Tuple[float, float]] = {}
+        self._cache_started = time.monotonic()
+
+    def expire_caches(self) -> None:
+        if self.cache_ttl_sec <= 0 or time.monotonic() - self._cache_started < self.cache_ttl_sec:
+            return
+        logger.info("Dropping API caches older than %ss", self.cache_ttl_sec)
+        self.geocode_cache = {}
+        self._reverse_caches = {}
+        for client in self._clients.values():
+            client.clear_cache()
+        self._cache_started = time.monotonic()
+
+    def _load(self, path: Path) -> Tuple[float, dict, CompiledRules]:
+        path = path.resolve()
+        mtime = path.stat().st_mtime
+        cached = self._configs.get(path)
+        if cached is None or cached[0] != mtime:
+            config = load_config(path)
+            cached = (mtime, config, CompiledRules(config))
+            self._configs[path] = cached
+        return cached
+
+    def config(self, path: Path) -> dict:
+        """A private copy of the config at ``path``; runs are free to modify it."""
+        return copy.deepcopy(self._load(path)[1])
+
+    def rules(self, path: Path) -> CompiledRules:
+        return self._load(path)[2]
+
+    def _index(self, kind: str, path: Optional[Path], loader: Callable):
+        if not path or not path.exists():
+            return loader(path)
+        mtime = path.stat().st_mtime
+        cached = self._indexes.get((kind, path))
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, loader(path))
+            self._indexes[(kind, path)] = cached
+        return cached[1]
+
+    def gazetteer(self, config: dict) -> Optional[RegionGazetteer]:
+        path = resolve_data_path(config.get("region", {}).get("gazetteer_path"))
+        return self._index("gazetteer", path, load_gazetteer)
+
+    def poi_index(self, config: dict) -> Optional[PoiIndex]:
+        path = resolve_data_path((config["pois"].get("local_index", {}) or {}).get("path"))
+        return self._index("pois", path, load_poi_index)
+
+    def reverse_cache(self, config: dict) -> ReverseGeocodeCache:
+        cache_cfg = config.get("cache", {}) or {}
+        key = (
+            float(cache_cfg.get("reverse_grid_m", 0)),
+            float(cache_cfg.get("reverse_verify_distance_m", 0)),
+        )
+        if key not in self._reverse_caches:
+            self._reverse_caches[key] = ReverseGeocodeCache(*key)
+        return self._reverse_caches[key]
+
+    def maps_client(self, config: dict, budget: Optional[ApiBudget]) -> NaverMapsClient:
+        client_id = os.getenv("NAVER_MAPS_CLIENT_ID", "")
+        client_secret = os.getenv("NAVER_MAPS_CLIENT_SECRET", "")
+        if not client_id or not client_secret:
+            raise SystemExit("Missing NAVER_MAPS_CLIENT_ID or NAVER_MAPS_CLIENT_SECRET in .env")
+        delay_sec = float(config.get("api", {}).get("request_delay_sec", 0))
+        base_url = config["api"]["maps_base_url"]
+        key = ("maps", client_id, client_secret, base_url, delay_sec)
+        if key not in self._clients:
+            self._clients[key] = NaverMapsClient(client_id, client_secret, base_url, delay_sec)
+        client = self._clients[key]
+        client.budget = budget
+        return client
+
+    def local_client(self, config: dict, budget: Optional[ApiBudget]) -> Optional[NaverLocalClient]:
+        client_id = os.getenv("NAVER_LOCAL_CLIENT_ID", "")
+        client_secret = os.getenv("NAVER_LOCAL_CLIENT_SECRET", "")
+        if not client_id or not client_secret:
+            return None
+        delay_sec = float(config.get("api", {}).get("request_delay_sec", 0))
+        base_url = config["api"]["local_base_url"]
+        key = ("local", client_id, client_secret, base_url, delay_sec)
+        if key not in self._clients:
+            self._clients[key] = NaverLocalClient(client_id, client_secret, base_url, delay_sec)
+        client = self._clients[key]
+        client.budget = budget
+        return client
+
+
+def resolve_data_path(value: Optional[str]) -> Optional[Path]:
+    if not value:
+        return None
+    path = Path(value)
+    return path if path.is_absolute() else BASE_DIR / path
+
+
+def open_export_index(config: dict, account: Optional[str]) -> Optional[ExportedKeywordIndex]:
+    index_cfg = config.get("export_index", {}) or {}
+    if not account or not index_cfg.get("enabled", False):
+        return None
+    return ExportedKeywordIndex(
+        resolve_data_path(index_cfg.get("root", "data/export_index")),
+        account,
+        int(index_cfg.get("capacity", 10_000_000)),
+        float(index_cfg.get("error_rate", 0.001)),
+    )
+
+
+def normalize_address(address: str) -> str:
+    text = BRACKET_RE.sub(" ", address or "").replace(",", " ")
+    tokens = text.split()
+    if not tokens:
+        return ""
+    tokens[0] = PROVINCE_ALIASES.get(tokens[0], tokens[0])
+    text = " ".join(tokens)
+    text = ROAD_NUMBER_RE.sub(r"\1 \2", ROAD_JOIN_RE.sub(r"\1\2", text))
+    # Anything after the road name and building number (floor, unit, building name) does not move
+    # the geocode, so it is dropped from the cache key.
+    match = ROAD_ADDRESS_RE.match(text)
+    return match.group(1) if match else text
+
+
 def split_terms(text: str) -> List[str]:
     if not text:
         return []
@@ -202,21 +504,26 @@ def address_tokens(address: str, region_keywords: Sequence[str]) -> List[str]:
     return list(dict.fromkeys(tokens))
 
 
-def derive_industries(service_text: str, service_terms: List[str], config: dict) -> List[str]:
-    synonyms = config.get("industry_synonyms", [])
-    for item in synonyms:
-        keywords = item.get("keywords", [])
-        if any(keyword in service_text for keyword in keywords):
-            return [item.get("industry")]
+def derive_industries(
+    service_text: str,
+    service_terms: List[str],
+    config: dict,
+    rules: Optional[CompiledRules] = None,
+) -> List[str]:
+    rules = rules or CompiledRules(config)
+    matched = rules.industry_keywords.find(service_text)
+    if matched:
+        return [rules.industry_synonyms[min(matched)].get("industry")]
     if service_terms:
         return [service_terms[0]]
     return []
 
 
-def extract_region_keywords(reverse_data: Optional[dict]) -> List[str]:
+def extract_region_chains(reverse_data: Optional[dict]) -> List[List[str]]:
+    """Admin area names of each reverse-geocode result, parent first (시/도, 시/군/구, 읍/면/동[, 리])."""
     if not reverse_data or "results" not in reverse_data:
         return []
-    regions = []
+    chains = []
     for result in reverse_data.get("results", []):
         region = result.get("region", {})
         area1 = region.get("area1", {}).get("name")
@@ -225,19 +532,23 @@ def extract_region_keywords(reverse_data: Optional[dict]) -> List[str]:
         area4 = region.get("area4", {}).get("name")
         if not area1:
             continue
+        if area1.endswith("시") or area1.endswith("광역시") or area1.endswith("특별시"):
+            chains.append([item for item in (area1, area2, area3) if item])
+        else:
+            chains.append([item for item in (area1, area2, area3, area4) if item])
+    return chains
+
+
+def extract_region_keywords(reverse_data: Optional[dict]) -> List[str]:
+    regions = []
+    for chain in extract_region_chains(reverse_data):
+        area1 = chain[0]
         short_area1 = None
         for suffix in ("특별자치시", "특별시", "광역시", "특별자치도", "자치도", "도", "시"):
             if area1.endswith(suffix) and len(area1) > len(suffix):
                 short_area1 = area1[: -len(suffix)]
                 break
-        if area1.endswith("시") or area1.endswith("광역시") or area1.endswith("특별시"):
-            for item in (area1, area2, area3):
-                if item:
-                    regions.append(item)
-        else:
-            for item in (area1, area2, area3, area4):
-                if item:
-                    regions.append(item)
+        regions.extend(chain)
         if short_area1:
             regions.append(short_area1)
     return list(dict.fromkeys([r for r in regions if r]))
@@ -251,12 +562,12 @@ def build_local_query(region_keywords: Sequence[str], base_query: str, max_terms
 
 
 def filter_pois(pois: Iterable[str], address_terms: Sequence[str]) -> List[str]:
-    address_set = set(address_terms)
+    address_matcher = TermAutomaton(dict.fromkeys(address_terms))
     filtered = []
     for poi in pois:
         if not poi:
             continue
-        if any(term in poi for term in address_set):
+        if address_matcher.contains_any(poi):
             continue
         filtered.append(poi)
     return list(dict.fromkeys(filtered))
@@ -272,67 +583,70 @@ def shorten_region_terms(terms: Sequence[str], suffixes: Sequence[str]) -> List[
     return list(dict.fromkeys(shortened))
 
 
-def combine_region_terms(terms: Sequence[str]) -> List[str]:
+def combine_region_terms(
+    terms: Sequence[str],
+    chains: Optional[Sequence[Sequence[str]]] = None,
+    suffixes: Sequence[str] = (),
+    max_terms: int = 0,
+) -> List[str]:
+    """Pairs of region terms; with ``chains`` only a level and its direct child (시+구, 구+동, 동+리)."""
     combos = []
-    if len(terms) < 2:
-        return combos
-    for first in terms:
-        for second in terms:
-            if first == second:
-                continue
-            combos.append(f"{first}{second}")
-    return list(dict.fromkeys(combos))
-
-
-def expand_services(service_text: str, service_terms: List[str], config: dict) -> List[str]:
+    if chains is None:
+        for first in terms:
+            for second in terms:
+                if first == second:
+                    continue
+                combos.append(f"{first}{second}")
+    else:
+        for chain in chains:
+            levels = [(shorten_region_terms([name], suffixes) or [name])[0] for name in chain]
+            for parent, child in zip(levels, levels[1:]):
+                if parent != child:
+                    combos.append(f"{parent}{child}")
+    combos = list(dict.fromkeys(combos))
+    if max_terms > 0:
+        combos = sorted(combos, key=len)[:max_terms]
+    return combos
+
+
+def expand_services(
+    service_text: str,
+    service_terms: List[str],
+    config: dict,
+    rules: Optional[CompiledRules] = None,
+) -> List[str]:
     keywords_cfg = config.get("keywords", {})
+    rules = rules or CompiledRules(config)
     expanded = list(service_terms)
     expanded.extend(keywords_cfg.get("service_terms", []) or [])
-    suffix_rules = keywords_cfg.get("service_suffix_rules", []) or []
     derived: List[str] = []
     for term in expanded:
-        for rule in suffix_rules:
-            suffix = rule.get("suffix")
-            additions = rule.get("add_suffixes", []) or []
-            if suffix and term.endswith(suffix):
-                base = term[: -len(suffix)]
-                if not base:
-                    continue
-                for add_suffix in additions:
-                    derived.append(f"{base}{add_suffix}")
+        for rule_id in rules.suffix_trie.proper_suffixes(term):
+            rule = rules.suffix_rules[rule_id]
+            base = term[: -len(rule["suffix"])]
+            for add_suffix in rule.get("add_suffixes", []) or []:
+                derived.append(f"{base}{add_suffix}")
     expanded.extend(derived)
-    for item in keywords_cfg.get("service_expansions", []) or []:
-        triggers = item.get("trigger_terms", []) or []
-        additions = item.get("include_terms", []) or []
-        if any(term in service_text for term in triggers) or any(
-            term in service for term in triggers for service in service_terms
-        ):
-            expanded.extend(additions)
+    triggered = rules.service_triggers.find(service_text)
+    for service in service_terms:
+        triggered.update(rules.service_triggers.find(service))
+    for group_id in sorted(triggered):
+        expanded.extend(rules.service_expansions[group_id].get("include_terms", []) or [])
     return list(dict.fromkeys([term for term in expanded if term]))
 
 
-def extract_name_terms(name: str, config: dict) -> List[str]:
-    keywords_cfg = config.get("keywords", {})
-    base_terms = keywords_cfg.get("name_base_terms", []) or []
-    suffix_terms = keywords_cfg.get("name_suffix_terms", []) or []
-    include_terms = keywords_cfg.get("name_include_terms", []) or []
-    expansions = keywords_cfg.get("name_expansions", []) or []
-
+def extract_name_terms(name: str, config: dict, rules: Optional[CompiledRules] = None) -> List[str]:
+    rules = rules or CompiledRules(config)
     found: List[str] = []
-    for term in include_terms:
-        if term and term in name:
-            found.append(term)
-    for base in base_terms:
-        if base and base in name:
-            found.append(base)
-            for suffix in suffix_terms:
-                if suffix and suffix in name:
-                    found.append(f"{base}{suffix}")
-    for item in expansions:
-        triggers = item.get("trigger_terms", []) or []
-        additions = item.get("include_terms", []) or []
-        if any(trigger in name for trigger in triggers):
-            found.extend(additions)
+    for term_id in sorted(rules.name_include.find(name)):
+        found.append(rules.name_include_terms[term_id])
+    suffixes = [rules.name_suffix_terms[term_id] for term_id in sorted(rules.name_suffix.find(name))]
+    for term_id in sorted(rules.name_base.find(name)):
+        base = rules.name_base_terms[term_id]
+        found.append(base)
+        found.extend(f"{base}{suffix}" for suffix in suffixes)
+    for group_id in sorted(rules.name_triggers.find(name)):
+        found.extend(rules.name_expansions[group_id].get("include_terms", []) or [])
     return list(dict.fromkeys([term for term in found if term]))
 
 
@@ -365,6 +679,9 @@ def pick_competition_radius(
     use_local = search_cfg.get("use_local_api", False)
     local_region_terms = search_cfg.get("local_region_terms", 2)
 
+    if not search_cfg.get("competition_lookup", True):
+        return int(radius_km)
+
     if use_local and local_client:
         local_query = build_local_query(region_keywords, query, local_region_terms)
         data = local_client.search_local(local_query, display=5)
@@ -396,6 +713,8 @@ def fetch_pois(
     region_keywords: Sequence[str],
     allowed_categories: Optional[Sequence[str]] = None,
     allowed_name_keywords: Optional[Sequence[str]] = None,
+    poi_index: Optional[PoiIndex] = None,
+    kind: Optional[str] = None,
 ) -> List[str]:
     if not config["pois"].get("enabled", True):
         return []
@@ -406,6 +725,19 @@ def fetch_pois(
     allowed_categories = allowed_categories or []
     allowed_name_keywords = allowed_name_keywords or []
 
+    index_cfg = config["pois"].get("local_index", {}) or {}
+    if poi_index and kind in (index_cfg.get("categories") or []) and poi_index.has_kind(kind):
+        items = poi_index.search(
+            longitude,
+            latitude,
+            radius_km * 1000,
+            kind,
+            limit=index_cfg.get("max_results", local_display),
+        )
+        names = extract_place_names_filtered({"items": items}, allowed_categories, allowed_name_keywords)
+        if names or not index_cfg.get("api_fallback", True):
+            return names
+
     if use_local and local_client:
         for query in queries:
             local_query = build_local_query(region_keywords, query, local_region_terms)
@@ -430,15 +762,158 @@ def fetch_pois(
     return list(dict.fromkeys([name for name in names if name]))
 
 
+def derive_row_services(
+    name: str,
+    service_text: str,
+    config: dict,
+    rules: Optional[CompiledRules] = None,
+) -> Tuple[List[str], List[str], str]:
+    rules = rules or CompiledRules(config)
+    services = split_terms(service_text)
+    services.extend(extract_name_terms(name, config, rules))
+    services = expand_services(service_text, services, config, rules)
+    industries = derive_industries(service_text, services, config, rules)
+    competition_query = industries[0] if industries else service_text
+    return services, industries, competition_query
+
+
+def poi_index_covers(config: dict, poi_index: Optional[PoiIndex], kind: str) -> bool:
+    index_cfg = config["pois"].get("local_index", {}) or {}
+    return poi_index is not None and kind in (index_cfg.get("categories") or []) and poi_index.has_kind(kind)
+
+
+def estimate_api_calls(
+    rows: Sequence[dict],
+    config: dict,
+    local_available: bool,
+    gazetteer: Optional[RegionGazetteer] = None,
+    poi_index: Optional[PoiIndex] = None,
+    geocode_cache: Optional[Mapping[str, Tuple[float, float]]] = None,
+    rules: Optional[CompiledRules] = None,
+    reverse_cache: Optional[ReverseGeocodeCache] = None,
+) -> Dict[str, int]:
+    """Pre-flight count of the distinct API requests build_business_contexts will make, per call group."""
+    search_cfg = config["search"]
+    poi_cfg = config["pois"]
+    cache_cfg = config.get("cache", {}) or {}
+    local_region_terms = search_cfg.get("local_region_terms", 2)
+    estimate = dict.fromkeys(("geocode", "reverse_geocode", "competition", "subway", "landmark"), 0)
+    local_competition = search_cfg.get("use_local_api", False) and local_available
+    if not search_cfg.get("competition_lookup", True):
+        competition_calls = 0
+    elif local_competition:
+        competition_calls = 1
+    else:
+        radius_steps = (search_cfg["radius_max_km"] - search_cfg["radius_start_km"]) / search_cfg["radius_step_km"]
+        competition_calls = int(radius_steps) + 1
+    local_pois = poi_cfg.get("use_local_api", False) and local_available
+    # Kinds answered by the local index still hit the API when it finds nothing, so with
+    # api_fallback their queries are counted as an upper bound.
+    api_fallback = (poi_cfg.get("local_index", {}) or {}).get("api_fallback", True)
+    poi_queries = {
+        kind: [] if not poi_cfg.get("enabled", True)
+        or (not api_fallback and poi_index_covers(config, poi_index, kind))
+        else list(poi_cfg.get(f"{kind}_queries", []))
+        for kind in ("subway", "landmark")
+    }
+
+    rules = rules or CompiledRules(config)
+    geocode_cache = geocode_cache if geocode_cache is not None else {}
+    cells = ReverseGeocodeCache(
+        float(cache_cfg.get("reverse_grid_m", 0)),
+        float(cache_cfg.get("reverse_verify_distance_m", 0)),
+    )
+    seen: Set[tuple] = set()
+
+    def count(group: str, request: tuple, calls: int = 1) -> None:
+        if request not in seen:
+            seen.add(request)
+            estimate[group] += calls
+
+    def reverse_fetch(longitude: float, latitude: float) -> dict:
+        estimate["reverse_geocode"] += 1
+        return {}
+
+    for row in rows:
+        address = row.get("주소(도로명)", "").strip()
+        if not address:
+            continue
+        address_key = normalize_address(address)
+        coords = geocode_cache.get(address_key)
+        if coords is None:
+            count("geocode", ("geocode", address_key))
+
+        region: Tuple[str, ...] = ()
+        if coords:
+            reverse_data = gazetteer.reverse_geocode(*coords) if gazetteer else None
+            if reverse_data is not None:
+                region = tuple(extract_region_keywords(reverse_data)[:local_region_terms])
+            elif reverse_cache is None or not reverse_cache.cached(*coords):
+                cells.lookup(coords[0], coords[1], reverse_fetch)
+        elif gazetteer is None:
+            count("reverse_geocode", ("reverse_geocode", address_key))
+        if not region:
+            region = tuple(address_key.split()[:local_region_terms])
+
+        _, _, query = derive_row_services(
+            row.get("상호명", "").strip(), row.get("주요서비스", "").strip(), config, rules
+        )
+        competition_key = region if local_competition else address_key
+        count("competition", ("competition", competition_key, query), competition_calls)
+        for kind, queries in poi_queries.items():
+            for poi_query in queries:
+                count(kind, (kind, region if local_pois else address_key, poi_query))
+    return estimate
+
+
+def apply_api_degradation(config: dict, dropped: Iterable[str]) -> None:
+    for group in dropped:
+        if group == "competition":
+            config["search"]["competition_lookup"] = False
+        else:
+            config["pois"][f"{group}_queries"] = []
+
+
 def build_business_contexts(
     rows: List[dict],
     maps_client: NaverMapsClient,
     local_client: Optional[NaverLocalClient],
     config: dict,
+    geocode_cache: Optional[Dict[str, Tuple[float, float]]] = None,
+    reverse_cache: Optional[ReverseGeocodeCache] = None,
+    gazetteer: Optional[RegionGazetteer] = None,
+    poi_index: Optional[PoiIndex] = None,
+    budget: Optional[ApiBudget] = None,
+    rules: Optional[CompiledRules] = None,
 ) -> List[BusinessContext]:
     contexts: List[BusinessContext] = []
-    geocode_cache: Dict[str, Optional[Tuple[float, float]]] = {}
-    reverse_cache: Dict[Tuple[float, float], Optional[dict]] = {}
+    cache_cfg = config.get("cache", {}) or {}
+    if gazetteer is None:
+        gazetteer = load_gazetteer(resolve_data_path(config.get("region", {}).get("gazetteer_path")))
+    if poi_index is None:
+        index_cfg = config.get("pois", {}).get("local_index", {}) or {}
+        poi_index = load_poi_index(resolve_data_path(index_cfg.get("path")))
+    if geocode_cache is None:
+        geocode_cache = {}
+    if reverse_cache is None:
+        reverse_cache = ReverseGeocodeCache(
+            float(cache_cfg.get("reverse_grid_m", 0)),
+            float(cache_cfg.get("reverse_verify_distance_m", 0)),
+        )
+    geocode_hits = 0
+    geocode_failed: Set[str] = set()
+    rules = rules or CompiledRules(config)
+
+    def degradable(group: str, fallback, call: Callable, *args):
+        # When the budget runs out mid-run, optional lookups stop using the API instead of failing the run.
+        try:
+            return call(*args)
+        except ApiBudgetExceeded:
+            if budget is None or budget.on_exceed != "degrade":
+                raise
+            logger.warning("API budget exhausted; skipping %s API lookups for the remaining rows", group)
+            apply_api_degradation(config, [group])
+            return fallback
 
     for row in rows:
         name = row.get("상호명", "").strip()
@@ -448,27 +923,36 @@ def build_business_contexts(
             logger.warning("Missing address for %s", name or "unknown")
             continue
 
-        if address not in geocode_cache:
-            geocode_cache[address] = maps_client.geocode(address)
-        coords = geocode_cache[address]
+        address_key = normalize_address(address)
+        coords = geocode_cache.get(address_key)
+        if coords is not None:
+            geocode_hits += 1
+        elif address_key not in geocode_failed:
+            coords = maps_client.geocode(address_key)
+            if not coords and address_key != address:
+                coords = maps_client.geocode(address)
+            if coords:
+                geocode_cache[address_key] = coords
+            else:
+                # Only remembered for this run; the next run (or daemon job) tries again.
+                geocode_failed.add(address_key)
         if not coords:
             logger.warning("Geocode failed for address: %s", address)
             continue
         longitude, latitude = coords
 
-        rev_key = (longitude, latitude)
-        if rev_key not in reverse_cache:
-            reverse_cache[rev_key] = maps_client.reverse_geocode(longitude, latitude)
-        region_keywords = extract_region_keywords(reverse_cache[rev_key])
+        reverse_data = gazetteer.reverse_geocode(longitude, latitude) if gazetteer else None
+        if reverse_data is None:
+            reverse_data = reverse_cache.lookup(longitude, latitude, maps_client.reverse_geocode)
+        region_keywords = extract_region_keywords(reverse_data)
+        region_chains = extract_region_chains(reverse_data)
 
-        services = split_terms(service_text)
-        name_terms = extract_name_terms(name, config)
-        services.extend(name_terms)
-        services = expand_services(service_text, services, config)
-        industries = derive_industries(service_text, services, config)
-        competition_query = industries[0] if industries else service_text
+        services, industries, competition_query = derive_row_services(name, service_text, config, rules)
 
-        radius_km = pick_competition_radius(
+        radius_km = degradable(
+            "competition",
+            int(config["search"]["radius_start_km"]),
+            pick_competition_radius,
             maps_client,
             local_client,
             competition_query,
@@ -481,7 +965,10 @@ def build_business_contexts(
         poi_cfg = config["pois"]
         allowed_categories = poi_cfg.get("allowed_categories", {})
         allowed_names = poi_cfg.get("allowed_name_keywords", {})
-        subway_pois = fetch_pois(
+        subway_pois = degradable(
+            "subway",
+            [],
+            fetch_pois,
             maps_client,
             local_client,
             longitude,
@@ -492,8 +979,13 @@ def build_business_contexts(
             region_keywords,
             allowed_categories.get("subway", []),
             allowed_names.get("subway", []),
+            poi_index,
+            "subway",
         )
-        landmark_pois = fetch_pois(
+        landmark_pois = degradable(
+            "landmark",
+            [],
+            fetch_pois,
             maps_client,
             local_client,
             longitude,
@@ -504,6 +996,8 @@ def build_business_contexts(
             region_keywords,
             allowed_categories.get("landmark", []),
             allowed_names.get("landmark", []),
+            poi_index,
+            "landmark",
         )
         address_terms = address_tokens(address, region_keywords)
         filtered_pois = filter_pois(subway_pois + landmark_pois, address_terms)
@@ -513,7 +1007,12 @@ def build_business_contexts(
         if region_cfg.get("combine_terms", False):
             suffixes = region_cfg.get("shorten_suffixes", [])
             shortened = shorten_region_terms(region_keywords, suffixes)
-            combined = combine_region_terms(shortened)
+            combined = combine_region_terms(
+                shortened,
+                region_chains if region_cfg.get("combine_mode", "hierarchy") == "hierarchy" else None,
+                suffixes,
+                int(region_cfg.get("combine_max_per_context", 0)),
+            )
             region_keywords = list(dict.fromkeys(region_keywords + shortened + combined))
 
         contexts.append(
@@ -529,20 +1028,37 @@ def build_business_contexts(
             )
         )
 
+    logger.info(
+        "Geocode cache hits: %s/%s, reverse geocode cache hits: %s/%s",
+        geocode_hits,
+        len(rows),
+        reverse_cache.hits,
+        reverse_cache.hits + reverse_cache.misses,
+    )
     return contexts
 
 
+def new_keyword_ranker(config: dict) -> KeywordRanker:
+    keywords_cfg = config.get("keywords", {}) or {}
+    return KeywordRanker(
+        int(keywords_cfg.get("spill_threshold", 0)),
+        resolve_data_path(keywords_cfg.get("spill_dir")),
+    )
+
+
 def generate_keywords(
     contexts: Sequence[BusinessContext],
     modifiers: Sequence[str],
     config: dict,
-) -> Dict[str, int]:
+    exported: Optional[Container[str]] = None,
+) -> KeywordRanker:
     patterns = config["keywords"]["patterns"]
     joiner = config["keywords"].get("joiner", "")
     exclude_regex = config["filters"].get("exclude_regex", [])
     exclude_pairs = config["filters"].get("exclude_pairs", [])
 
-    keyword_rank: Dict[str, int] = {}
+    keyword_rank = new_keyword_ranker(config)
+    skipped: Set[str] = set()
     for context in contexts:
         columns = {
             "region": context.region_keywords,
@@ -559,8 +1075,13 @@ def generate_keywords(
                 keyword = joiner.join(combo)
                 if should_exclude(keyword, exclude_regex, exclude_pairs):
                     continue
-                if keyword not in keyword_rank or keyword_rank[keyword] > len(pattern):
-                    keyword_rank[keyword] = len(pattern)
+                if exported is not None and keyword not in keyword_rank:
+                    if keyword in skipped or keyword in exported:
+                        if len(skipped) >= keyword_rank.spill_threshold > 0:
+                            skipped.clear()
+                        skipped.add(keyword)
+                        continue
+                keyword_rank.add(keyword, len(pattern))
     return keyword_rank
 
 
@@ -571,7 +1092,9 @@ def generate_keywords_from_components(
     poi_terms: Sequence[str],
     patterns: Sequence[Sequence[str]],
     config: dict,
-) -> Dict[str, int]:
+    exported: Optional[Container[str]] = None,
+    progress: Optional[Callable[[int], None]] = None,
+) -> KeywordRanker:
     joiner = config["keywords"].get("joiner", "")
     exclude_regex = config["filters"].get("exclude_regex", [])
     exclude_pairs = config["filters"].get("exclude_pairs", [])
@@ -581,20 +1104,106 @@ def generate_keywords_from_components(
         "modifier": list(modifier_terms),
         "poi": list(poi_terms),
     }
-    keyword_rank: Dict[str, int] = {}
+    keyword_rank = new_keyword_ranker(config)
+    skipped: Set[str] = set()
+    combinations = 0
     for pattern in patterns:
         parts = [columns.get(key, []) for key in pattern]
         if any(not part for part in parts):
             continue
         for combo in product(*parts):
+            combinations += 1
+            if progress is not None and combinations % PROGRESS_EVERY == 0:
+                progress(combinations)
             keyword = joiner.join(combo)
             if should_exclude(keyword, exclude_regex, exclude_pairs):
                 continue
-            if keyword not in keyword_rank or keyword_rank[keyword] > len(pattern):
-                keyword_rank[keyword] = len(pattern)
+            if exported is not None and keyword not in keyword_rank:
+                if keyword in skipped or keyword in exported:
+                    if len(skipped) >= keyword_rank.spill_threshold > 0:
+                        skipped.clear()
+                    skipped.add(keyword)
+                    continue
+            keyword_rank.add(keyword, len(pattern))
     return keyword_rank
 
 
+def preview_keywords_from_components(
+    region_terms: Sequence[str],
+    service_terms: Sequence[str],
+    modifier_terms: Sequence[str],
+    poi_terms: Sequence[str],
+    patterns: Sequence[Sequence[str]],
+    config: dict,
+    limit: int,
+    max_combinations: int,
+    exported: Optional[Container[str]] = None,
+) -> List[str]:
+    """The first ``limit`` keywords of the full ranking, built from the shortest patterns only."""
+    sizes = {
+        "region": len(region_terms),
+        "service": len(service_terms),
+        "modifier": len(modifier_terms),
+        "poi": len(poi_terms),
+    }
+    by_length: Dict[int, List[Sequence[str]]] = {}
+    for pattern in patterns:
+        by_length.setdefault(len(pattern), []).append(pattern)
+
+    preview: List[str] = []
+    seen: Set[str] = set()
+    for length in sorted(by_length):
+        group = by_length[length]
+        if sum(math.prod(sizes.get(key, 0) for key in pattern) for pattern in group) > max_combinations:
+            break
+        with generate_keywords_from_components(
+            region_terms, service_terms, modifier_terms, poi_terms, group, config, exported
+        ) as keyword_rank:
+            ranked = [keyword for keyword, _ in keyword_rank.ranked() if keyword not in seen]
+        preview.extend(ranked[: limit - len(preview)])
+        if len(preview) >= limit:
+            break
+        seen.update(ranked)
+    return preview
+
+
+def sample_keywords_from_components(
+    region_terms: Sequence[str],
+    service_terms: Sequence[str],
+    modifier_terms: Sequence[str],
+    poi_terms: Sequence[str],
+    patterns: Sequence[Sequence[str]],
+    config: dict,
+    size: int,
+    mode: str = "uniform",
+    seed: Optional[int] = None,
+    exported: Optional[Container[str]] = None,
+    max_draws_factor: int = 20,
+) -> dict:
+    """Random keywords the patterns would produce, with exact combination counts per pattern."""
+    exclude_regex = config["filters"].get("exclude_regex", [])
+    exclude_pairs = config["filters"].get("exclude_pairs", [])
+
+    def accept(keyword: str) -> bool:
+        if should_exclude(keyword, exclude_regex, exclude_pairs):
+            return False
+        return exported is None or keyword not in exported
+
+    sampler = KeywordSampler(
+        patterns,
+        {
+            "region": list(region_terms),
+            "service": list(service_terms),
+            "modifier": list(modifier_terms),
+            "poi": list(poi_terms),
+        },
+        config["keywords"].get("joiner", ""),
+        accept,
+        max_draws_factor,
+    )
+    return sampler.sample(size, mode, seed)
+
+
 def read_csv_rows(path: Path) -> List[dict]:
     with path.open("r", encoding="utf-8-sig", newline="") as handle:
         reader = csv.DictReader(handle)
@@ -605,50 +1214,253 @@ def read_ad_group_ids(path: Path) -> List[str]:
     rows = read_csv_rows(path)
     ids = []
     for row in rows:
-        value = row.get("ad_group_id", "").strip()
+        value = row.get(AD_GROUP_ID_COLUMN, "").strip()
         if value:
             ids.append(value)
     return ids
 
 
-def write_output(
-    output_dir: Path,
-    ad_group_ids: Sequence[str],
-    keywords: List[str],
-    keywords_per_group: int,
-    config: dict,
-) -> None:
-    output_dir.mkdir(parents=True, exist_ok=True)
+def ad_group_filename(index: int) -> str:
+    return f"ad_group_{index + 1:04d}.csv"
+
+
+def write_ad_group_csv(handle, ad_group_id: str, keywords: Iterable[str], config: dict) -> None:
     output_cfg = config.get("output", {})
-    encoding = output_cfg.get("encoding", "utf-8-sig")
     template = output_cfg.get("template", "")
     header_rows = output_cfg.get("header_rows", [])
     columns = output_cfg.get("columns", ["ad_group_id", "keyword"])
     default_pc_url = output_cfg.get("default_pc_url", "")
     default_mobile_url = output_cfg.get("default_mobile_url", "")
     default_bid = output_cfg.get("default_bid", "")
+    writer = csv.writer(handle)
+    if template == "naver_csv":
+        for row in header_rows:
+            writer.writerow(row)
+        writer.writerow(columns)
+    else:
+        writer.writerow(columns)
+    for keyword in keywords:
+        if template == "naver_csv":
+            writer.writerow([ad_group_id, keyword, default_pc_url, default_mobile_url, default_bid])
+        else:
+            writer.writerow([ad_group_id, keyword])
+
+
+def render_ad_group_csv(ad_group_id: str, keywords: Iterable[str], config: dict) -> bytes:
+    encoding = config.get("output", {}).get("encoding", "utf-8-sig")
+    buffer = io.StringIO(newline="")
+    write_ad_group_csv(buffer, ad_group_id, keywords, config)
+    return buffer.getvalue().encode(encoding)
+
+
+def write_output(
+    output_dir: Path,
+    ad_group_ids: Sequence[str],
+    keywords: Sequence[str],
+    keywords_per_group: int,
+    config: dict,
+    offsets: Optional[Sequence[int]] = None,
+    order: Optional[Sequence[int]] = None,
+) -> None:
+    output_dir.mkdir(parents=True, exist_ok=True)
+    encoding = config.get("output", {}).get("encoding", "utf-8-sig")
     for index, ad_group_id in enumerate(ad_group_ids):
-        start = index * keywords_per_group
-        end = start + keywords_per_group
-        chunk = keywords[start:end]
-        if not chunk:
-            break
-        output_path = output_dir / f"ad_group_{index + 1:04d}.csv"
+        if offsets is not None:
+            chunk = group_keywords(keywords, offsets, order, index)
+            if not chunk:
+                continue
+        else:
+            start = index * keywords_per_group
+            end = start + keywords_per_group
+            chunk = keywords[start:end]
+            if not chunk:
+                break
+        output_path = output_dir / ad_group_filename(index)
         with output_path.open("w", encoding=encoding, newline="") as handle:
-            writer = csv.writer(handle)
-            if template == "naver_csv":
-                for row in header_rows:
-                    writer.writerow(row)
-                writer.writerow(columns)
-            else:
-                writer.writerow(columns)
-            for keyword in chunk:
-                if template == "naver_csv":
-                    writer.writerow(
-                        [ad_group_id, keyword, default_pc_url, default_mobile_url, default_bid]
-                    )
-                else:
-                    writer.writerow([ad_group_id, keyword])
+            write_ad_group_csv(handle, ad_group_id, chunk, config)
+
+
+def delta_enabled(config: dict) -> bool:
+    return bool((config.get("output", {}).get("delta", {}) or {}).get("enabled", False))
+
+
+def prepare_delta(
+    exported_index: Optional[ExportedKeywordIndex],
+    ad_group_ids: Sequence[str],
+    config: dict,
+) -> Optional[Dict[str, List[str]]]:
+    """Previous assignment of ``ad_group_ids``, or None when no delta export applies."""
+    if exported_index is None or not delta_enabled(config):
+        return None
+    exported_index.exempt_groups = set(ad_group_ids)
+    return exported_index.assignment(ad_group_ids)
+
+
+def assign_ad_groups(
+    keywords: Sequence[str],
+    ad_group_ids: Sequence[str],
+    keywords_per_group: int,
+    previous: Optional[Dict[str, List[str]]] = None,
+) -> List[List[str]]:
+    """Split ranked keywords into ad groups, keeping previously exported keywords in their group."""
+    positions = {keyword: index for index, keyword in enumerate(keywords)}
+    groups: List[List[str]] = []
+    placed: Set[str] = set()
+    for ad_group_id in ad_group_ids:
+        kept = [keyword for keyword in (previous or {}).get(ad_group_id, []) if keyword in positions]
+        kept = [keyword for keyword in kept if keyword not in placed]
+        if len(kept) > keywords_per_group:
+            best = set(sorted(kept, key=positions.__getitem__)[:keywords_per_group])
+            kept = [keyword for keyword in kept if keyword in best]
+        groups.append(kept)
+        placed.update(kept)
+    remaining = (keyword for keyword in keywords if keyword not in placed)
+    for group in groups:
+        group.extend(islice(remaining, keywords_per_group - len(group)))
+    return groups
+
+
+def group_offsets(groups: Sequence[Sequence[str]]) -> List[int]:
+    offsets = [0]
+    for group in groups:
+        offsets.append(offsets[-1] + len(group))
+    return offsets
+
+
+def group_keywords(
+    keywords: Sequence[str],
+    offsets: Sequence[int],
+    order: Optional[Sequence[int]],
+    index: int,
+) -> List[str]:
+    if order is None:
+        return list(keywords[offsets[index] : offsets[index + 1]])
+    return [keywords[position] for position in order[offsets[index] : offsets[index + 1]]]
+
+
+def write_delta(
+    output_dir: Path,
+    ad_group_ids: Sequence[str],
+    groups: Sequence[Sequence[str]],
+    previous: Dict[str, List[str]],
+    config: dict,
+    account: Optional[str] = None,
+) -> dict:
+    """Write per-group add/remove CSVs for changed groups only, plus manifest.json."""
+    output_cfg = config.get("output", {})
+    delta_cfg = output_cfg.get("delta", {}) or {}
+    encoding = output_cfg.get("encoding", "utf-8-sig")
+    remove_columns = delta_cfg.get("remove_columns", ["ad_group_id", "keyword"])
+    delta_dir = output_dir / delta_cfg.get("dir_name", "delta")
+    delta_dir.mkdir(parents=True, exist_ok=True)
+    entries = []
+    for index, (ad_group_id, group) in enumerate(zip(ad_group_ids, groups)):
+        before = previous.get(ad_group_id, [])
+        before_set = set(before)
+        group_set = set(group)
+        added = [keyword for keyword in group if keyword not in before_set]
+        removed = [keyword for keyword in before if keyword not in group_set]
+        if not added and not removed:
+            continue
+        stem = ad_group_filename(index)[: -len(".csv")]
+        entry = {
+            "ad_group_id": ad_group_id,
+            "added": len(added),
+            "removed": len(removed),
+            "kept": len(group) - len(added),
+        }
+        if added:
+            entry["add_file"] = f"{stem}_add.csv"
+            with (delta_dir / entry["add_file"]).open("w", encoding=encoding, newline="") as handle:
+                write_ad_group_csv(handle, ad_group_id, added, config)
+        if removed:
+            entry["remove_file"] = f"{stem}_remove.csv"
+            with (delta_dir / entry["remove_file"]).open("w", encoding=encoding, newline="") as handle:
+                writer = csv.writer(handle)
+                writer.writerow(remove_columns)
+                writer.writerows([ad_group_id, keyword] for keyword in removed)
+        entries.append(entry)
+    manifest = {
+        "account": account,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "previous_total": sum(len(keywords) for keywords in previous.values()),
+        "added": sum(entry["added"] for entry in entries),
+        "removed": sum(entry["removed"] for entry in entries),
+        "changed_groups": len(entries),
+        "unchanged_groups": len(ad_group_ids) - len(entries),
+        "ad_groups": entries,
+    }
+    manifest_path = delta_dir / "manifest.json"
+    manifest_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    manifest["dir"] = delta_dir
+    logger.info(
+        "Delta export: +%s / -%s keywords in %s of %s ad groups",
+        manifest["added"],
+        manifest["removed"],
+        len(entries),
+        len(ad_group_ids),
+    )
+    return manifest
+
+
+def export_keywords(
+    output_dir: Path,
+    artifact_path: Path,
+    keyword_rank: KeywordRanker,
+    ad_group_ids: Sequence[str],
+    keywords_per_group: int,
+    config: dict,
+    previous: Optional[Dict[str, List[str]]] = None,
+    account: Optional[str] = None,
+) -> dict:
+    """Assign the top ranked keywords to ad groups and write the artifact, group CSVs and delta."""
+    target_total = len(ad_group_ids) * keywords_per_group
+    with keyword_rank:
+        ranks = dict(islice(keyword_rank.ranked(), target_total))
+    ranked = list(ranks)
+    groups = assign_ad_groups(ranked, ad_group_ids, keywords_per_group, previous)
+    write_keyword_artifact(artifact_path, ranks.items())
+    offsets = group_offsets(groups)
+    order = None
+    if previous is not None:
+        positions = {keyword: position for position, keyword in enumerate(ranked)}
+        order = array("I", (positions[keyword] for group in groups for keyword in group))
+    artifact = KeywordArtifact(artifact_path)
+    try:
+        write_output(output_dir, ad_group_ids, artifact, keywords_per_group, config, offsets, order)
+    finally:
+        artifact.close()
+    delta = None
+    if previous is not None:
+        delta = write_delta(output_dir, ad_group_ids, groups, previous, config, account)
+    return {
+        "artifact_path": artifact_path,
+        "generated_total": offsets[-1],
+        "group_offsets": offsets,
+        "group_order": order,
+        "delta": delta,
+    }
+
+
+def record_assignment(
+    exported_index: ExportedKeywordIndex,
+    ad_group_ids: Sequence[str],
+    keywords: Sequence[str],
+    offsets: Sequence[int],
+    order: Optional[Sequence[int]] = None,
+    release: bool = False,
+) -> int:
+    return exported_index.record_assignment(
+        (
+            (ad_group_id, group_keywords(keywords, offsets, order, index))
+            for index, ad_group_id in enumerate(ad_group_ids)
+        ),
+        release,
+    )
+
+
+def delta_removed(delta: Optional[dict]) -> bool:
+    return bool(delta and delta["removed"])
 
 
 def run_pipeline(
@@ -661,21 +1473,18 @@ def run_pipeline(
     extra_service_terms: Optional[List[str]] = None,
     allow_shortfall: bool = False,
     poi_filter_set: Optional[str] = None,
+    account: Optional[str] = None,
+    record_export: bool = True,
+    profile: bool = False,
+    estimate_only: bool = False,
+    runtime: Optional[PipelineRuntime] = None,
 ) -> dict:
     logging.basicConfig(level=log_level, format="%(levelname)s: %(message)s")
 
-    env_file = env_path or (Path(__file__).resolve().parent / ".env")
-    load_dotenv(env_file)
-
-    maps_client_id = os.getenv("NAVER_MAPS_CLIENT_ID", "")
-    maps_client_secret = os.getenv("NAVER_MAPS_CLIENT_SECRET", "")
-    local_client_id = os.getenv("NAVER_LOCAL_CLIENT_ID", "")
-    local_client_secret = os.getenv("NAVER_LOCAL_CLIENT_SECRET", "")
-
-    if not maps_client_id or not maps_client_secret:
-        raise SystemExit("Missing NAVER_MAPS_CLIENT_ID or NAVER_MAPS_CLIENT_SECRET in .env")
-
-    config = load_config(config_path)
+    if runtime is None:
+        runtime = PipelineRuntime(env_path or (BASE_DIR / ".env"))
+    runtime.expire_caches()
+    config = runtime.config(config_path)
     if poi_filter_set:
         poi_cfg = config.setdefault("pois", {})
         filter_sets = poi_cfg.get("filter_sets", {})
@@ -688,36 +1497,71 @@ def run_pipeline(
         service_terms = keywords_cfg.get("service_terms", []) or []
         service_terms = list(dict.fromkeys(service_terms + extra_service_terms))
         keywords_cfg["service_terms"] = service_terms
-    delay_sec = float(config.get("api", {}).get("request_delay_sec", 0))
-
-    maps_client = NaverMapsClient(
-        maps_client_id,
-        maps_client_secret,
-        config["api"]["maps_base_url"],
-        delay_sec,
-    )
-
-    local_client = None
-    if local_client_id and local_client_secret:
-        local_client = NaverLocalClient(
-            local_client_id,
-            local_client_secret,
-            config["api"]["local_base_url"],
-            delay_sec,
+    budget_cfg = config.get("budget", {}) or {}
+    budget = None
+    if budget_cfg.get("enabled", False):
+        budget = ApiBudget(
+            int(budget_cfg.get("per_run", 0)),
+            int(budget_cfg.get("per_day", 0)),
+            resolve_data_path(budget_cfg.get("state_path")),
+            budget_cfg.get("on_exceed", "degrade"),
         )
+
+    maps_client = runtime.maps_client(config, budget)
+    local_client = runtime.local_client(config, budget)
     if (config["search"].get("use_local_api") or config["pois"].get("use_local_api")) and not local_client:
         raise SystemExit("Missing NAVER_LOCAL_CLIENT_ID or NAVER_LOCAL_CLIENT_SECRET in .env")
 
     input_rows = read_csv_rows(input_path)
-    required_columns = {"상호명", "주소(도로명)", "주요서비스"}
-    if not input_rows or not required_columns.issubset(input_rows[0].keys()):
-        raise SystemExit("Input CSV must include columns: 상호명, 주소(도로명), 주요서비스")
+    if not input_rows or not set(REQUIRED_INPUT_COLUMNS).issubset(input_rows[0].keys()):
+        raise SystemExit(f"Input CSV must include columns: {', '.join(REQUIRED_INPUT_COLUMNS)}")
 
     ad_group_ids = read_ad_group_ids(ad_groups_path)
     if not ad_group_ids:
         raise SystemExit("No ad_group_id values found in ad group CSV")
 
-    contexts = build_business_contexts(input_rows, maps_client, local_client, config)
+    gazetteer = runtime.gazetteer(config)
+    poi_index = runtime.poi_index(config)
+    rules = runtime.rules(config_path)
+    api_estimate = estimate_api_calls(
+        input_rows,
+        config,
+        local_client is not None,
+        gazetteer,
+        poi_index,
+        runtime.geocode_cache,
+        rules,
+        runtime.reverse_cache(config),
+    )
+    logger.info("Estimated API calls: %s (total %s)", api_estimate, sum(api_estimate.values()))
+    degraded: List[str] = []
+    if budget is not None:
+        degraded = budget.plan(api_estimate, budget_cfg.get("degrade_order") or DEFAULT_DEGRADE_ORDER)
+        if degraded:
+            logger.warning("API budget too small for this run; skipping %s API lookups", ", ".join(degraded))
+            apply_api_degradation(config, degraded)
+    if estimate_only:
+        return {"api_estimate": api_estimate, "api_budget_remaining": budget.remaining() if budget else None}
+
+    profiler = StageProfiler(enabled=profile)
+    try:
+        with profiler.stage("build_business_contexts"):
+            contexts = build_business_contexts(
+                input_rows,
+                maps_client,
+                local_client,
+                config,
+                geocode_cache=runtime.geocode_cache,
+                reverse_cache=runtime.reverse_cache(config),
+                gazetteer=gazetteer,
+                poi_index=poi_index,
+                budget=budget,
+                rules=rules,
+            )
+    finally:
+        if budget is not None:
+            budget.save()
+            logger.info("API calls this run: %s", budget.by_api)
     if not contexts:
         raise SystemExit(
             "No valid business contexts built. Check input columns and Maps Geocoding subscription."
@@ -728,40 +1572,79 @@ def run_pipeline(
     keywords_per_group = config["output"]["keywords_per_group"]
     target_total = len(ad_group_ids) * keywords_per_group
 
-    keyword_rank: Dict[str, int] = {}
-    for tier in modifiers_tiers:
-        selected_modifiers.extend(tier)
-        keyword_rank = generate_keywords(contexts, selected_modifiers, config)
-        if len(keyword_rank) >= target_total:
-            break
+    exported_index = open_export_index(config, account)
+    previous = prepare_delta(exported_index, ad_group_ids, config)
+    keyword_rank = new_keyword_ranker(config)
+    with profiler.stage("generate_keywords"):
+        for tier in modifiers_tiers:
+            selected_modifiers.extend(tier)
+            keyword_rank.close()
+            keyword_rank = generate_keywords(contexts, selected_modifiers, config, exported_index)
+            if len(keyword_rank) >= target_total:
+                break
 
     shortfall = 0
     if len(keyword_rank) < target_total:
         shortfall = target_total - len(keyword_rank)
         if not allow_shortfall:
+            keyword_rank.close()
+            if exported_index is not None:
+                exported_index.close()
             raise SystemExit(
                 f"Not enough keywords ({len(keyword_rank)}) to fill {target_total}. "
                 "Add more modifiers or loosen filters."
             )
 
-    sorted_keywords = sorted(
-        keyword_rank.items(),
-        key=lambda item: (item[1], len(item[0]), item[0]),
-    )
-    final_keywords = [keyword for keyword, _ in sorted_keywords[:target_total]]
-
-    write_output(output_dir, ad_group_ids, final_keywords, keywords_per_group, config)
+    with profiler.stage("write_output"):
+        export = export_keywords(
+            output_dir,
+            output_dir / config["output"].get("artifact_name", "keywords.kga"),
+            keyword_rank,
+            ad_group_ids,
+            keywords_per_group,
+            config,
+            previous,
+            account,
+        )
+    artifact_path = export["artifact_path"]
+    generated_total = export["generated_total"]
+    if exported_index is not None:
+        if record_export:
+            artifact = KeywordArtifact(artifact_path)
+            record_assignment(
+                exported_index,
+                ad_group_ids,
+                artifact,
+                export["group_offsets"],
+                export["group_order"],
+                delta_removed(export["delta"]),
+            )
+            artifact.close()
+        exported_index.close()
     logger.info("Generated %s files in %s", len(ad_group_ids), output_dir)
     merged_regions = sorted({term for ctx in contexts for term in ctx.region_keywords})
     merged_services = sorted({term for ctx in contexts for term in ctx.services})
     merged_pois = sorted({term for ctx in contexts for term in ctx.poi_keywords})
     patterns = config.get("keywords", {}).get("patterns", [])
+    profile_result = None
+    if profile:
+        profile_cfg = config.get("profiling", {})
+        profile_files = profiler.write(output_dir, profile_cfg.get("file_name", "profile"))
+        profile_result = profiler.summary(int(profile_cfg.get("top_n", 20)))
+        profile_result["files"] = profile_files
+        for stage in profile_result["stages"]:
+            logger.info("Stage %s: %.3fs, peak %.2f MB", stage["name"], stage["wall_sec"], stage["peak_mb"])
+        logger.info("Profile written to %s", ", ".join(str(path) for path in profile_files.values()))
     return {
         "target_total": target_total,
-        "generated_total": len(final_keywords),
+        "generated_total": generated_total,
+        "artifact_path": artifact_path,
         "shortfall": shortfall,
         "ad_group_ids": ad_group_ids,
         "keywords_per_group": keywords_per_group,
+        "group_offsets": export["group_offsets"],
+        "group_order": export["group_order"],
+        "delta": export["delta"],
         "components": {
             "regions": merged_regions,
             "services": merged_services,
@@ -769,27 +1652,32 @@ def run_pipeline(
             "pois": merged_pois,
         },
         "patterns": patterns,
+        "profile": profile_result,
+        "api_estimate": api_estimate,
+        "api_calls": budget.by_api if budget else None,
+        "degraded": degraded,
     }
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Keyword generator for Naver search ads")
-    parser.add_argument("--input", required=True, help="Business input CSV")
-    parser.add_argument("--ad-groups", required=True, help="Ad group CSV with ad_group_id column")
-    parser.add_argument("--output-dir", required=True, help="Output directory for CSV files")
-    parser.add_argument("--config", default="config.yaml", help="Config YAML path")
-    parser.add_argument("--log-level", default="INFO")
-    args = parser.parse_args()
-
-    run_pipeline(
+def run_from_args(args: argparse.Namespace, runtime: Optional[PipelineRuntime] = None) -> dict:
+    return run_pipeline(
         input_path=Path(args.input),
         ad_groups_path=Path(args.ad_groups),
         output_dir=Path(args.output_dir),
         config_path=Path(args.config),
-        env_path=Path(__file__).resolve().parent / ".env",
+        env_path=BASE_DIR / ".env",
         log_level=args.log_level,
+        account=args.account,
+        profile=args.profile,
+        estimate_only=args.estimate_calls,
+        runtime=runtime,
     )
 
 
+def main() -> None:
+    args = build_arg_parser().parse_args()
+    print_result(args, run_from_args(args))
+
+
 if __name__ == "__main__":
     main()
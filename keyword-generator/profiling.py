@@ -0,0 +1,138 @@
+import cProfile
+import os
+import pstats
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+
+FuncKey = Tuple[str, int, str]
+COLLAPSED_MAX_DEPTH = 64
+COLLAPSED_MIN_FRACTION = 0.0001
+
+
+def function_label(func: FuncKey) -> str:
+    filename, line, name = func
+    if filename == "~":
+        return name.replace(";", ",")
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(";", ",")
+
+
+def collapsed_stacks(
+    stats: pstats.Stats,
+    prefix: str,
+    max_depth: int = COLLAPSED_MAX_DEPTH,
+    min_fraction: float = COLLAPSED_MIN_FRACTION,
+) -> Dict[str, int]:
+    """Approximate collapsed stacks (microseconds) from the caller graph of a cProfile run.
+
+    Each function's own time is split across its call paths in proportion to the cumulative
+    time each caller edge contributed, which is what flamegraph tools expect as input. Paths
+    deeper than ``max_depth`` or worth less than ``min_fraction`` of the total time are dropped,
+    which keeps the walk bounded on large call graphs.
+    """
+    raw = stats.stats
+    children: Dict[FuncKey, List[Tuple[FuncKey, float]]] = defaultdict(list)
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, (_, _, _, edge_ct) in callers.items():
+            children[caller].append((func, edge_ct))
+    min_time = sum(entry[2] for entry in raw.values()) * min_fraction
+    labels = {func: function_label(func) for func in raw}
+
+    lines: Dict[str, int] = defaultdict(int)
+    pending = [((func,), 1.0) for func, (_, _, _, _, callers) in raw.items() if not callers]
+    while pending:
+        path, fraction = pending.pop()
+        func = path[-1]
+        value = int(raw[func][2] * fraction * 1_000_000)
+        if value > 0:
+            lines[";".join([prefix, *(labels[step] for step in path)])] += value
+        if len(path) >= max_depth:
+            continue
+        for child, edge_ct in children.get(func, []):
+            child_ct = raw[child][3]
+            if child in path or child_ct <= 0 or edge_ct <= 0:
+                continue
+            child_fraction = fraction * min(edge_ct / child_ct, 1.0)
+            if child_ct * child_fraction < min_time:
+                continue
+            pending.append((path + (child,), child_fraction))
+    return lines
+
+
+class StageProfiler:
+    """Per-stage CPU profiles and tracemalloc peaks for a pipeline run; a no-op when disabled."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.stages: List[dict] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            wall_sec = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+            self.stages.append({"name": name, "profile": profile, "wall_sec": wall_sec, "peak_bytes": peak})
+
+    def _combined(self) -> pstats.Stats:
+        stats = pstats.Stats(self.stages[0]["profile"])
+        for stage in self.stages[1:]:
+            stats.add(stage["profile"])
+        return stats
+
+    def write(self, output_dir: Path, name: str = "profile") -> Dict[str, Path]:
+        if not self.stages:
+            return {}
+        output_dir.mkdir(parents=True, exist_ok=True)
+        pstats_path = output_dir / f"{name}.pstats"
+        self._combined().dump_stats(str(pstats_path))
+        collapsed_path = output_dir / f"{name}.collapsed"
+        with collapsed_path.open("w", encoding="utf-8") as handle:
+            for stage in self.stages:
+                stacks = collapsed_stacks(pstats.Stats(stage["profile"]), stage["name"])
+                for stack, value in sorted(stacks.items()):
+                    handle.write(f"{stack} {value}\n")
+        return {"pstats": pstats_path, "collapsed": collapsed_path}
+
+    def summary(self, top_n: int = 20) -> dict:
+        if not self.stages:
+            return {}
+        stats = self._combined()
+        hot = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:top_n]
+        return {
+            "stages": [
+                {
+                    "name": stage["name"],
+                    "wall_sec": round(stage["wall_sec"], 4),
+                    "peak_mb": round(stage["peak_bytes"] / (1024 * 1024), 2),
+                }
+                for stage in self.stages
+            ],
+            "hot_functions": [
+                {
+                    "function": function_label(func),
+                    "calls": calls,
+                    "tottime": round(tottime, 4),
+                    "cumtime": round(cumtime, 4),
+                }
+                for func, (_, calls, tottime, cumtime, _) in hot
+            ],
+        }
@@ -0,0 +1,127 @@
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+
+class TermAutomaton:
+    """Aho-Corasick automaton: finds every pattern occurring in a text in one pass over the text.
+
+    ``find`` reports each matched pattern's label, which defaults to its index in ``patterns``.
+    """
+
+    def __init__(self, patterns: Iterable[str], labels: Optional[Sequence[int]] = None):
+        self.patterns = list(patterns)
+        labels = list(labels) if labels is not None else list(range(len(self.patterns)))
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        for pattern_id, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(labels[pattern_id])
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text: str) -> Set[int]:
+        """Labels of every pattern that occurs in ``text``."""
+        goto, fail, output = self._goto, self._fail, self._output
+        found: Set[int] = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+    def contains_any(self, text: str) -> bool:
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                return True
+        return False
+
+
+class SuffixTrie:
+    """Trie over reversed suffixes: which suffixes end a term, found in one backwards walk."""
+
+    def __init__(self, suffixes: Iterable[str]):
+        self.suffixes = list(suffixes)
+        self._children: List[Dict[str, int]] = [{}]
+        self._ids: List[List[int]] = [[]]
+        for suffix_id, suffix in enumerate(self.suffixes):
+            if not suffix:
+                continue
+            node = 0
+            for char in reversed(suffix):
+                child = self._children[node].get(char)
+                if child is None:
+                    child = len(self._children)
+                    self._children[node][char] = child
+                    self._children.append({})
+                    self._ids.append([])
+                node = child
+            self._ids[node].append(suffix_id)
+
+    def proper_suffixes(self, term: str) -> List[int]:
+        """Ids of suffixes that end ``term`` and are shorter than it, in id order."""
+        matched: List[int] = []
+        node = 0
+        for depth, char in enumerate(reversed(term), start=1):
+            node = self._children[node].get(char)
+            if node is None or depth >= len(term):
+                break
+            matched.extend(self._ids[node])
+        return sorted(matched)
+
+
+def group_automaton(groups: Sequence[dict], key: str) -> TermAutomaton:
+    """One automaton over ``group[key]`` terms of every group, labelled with the group's index."""
+    terms = [(group_id, term) for group_id, item in enumerate(groups) for term in (item.get(key, []) or [])]
+    return TermAutomaton([term for _, term in terms], [group_id for group_id, _ in terms])
+
+
+class CompiledRules:
+    """Term rules from the keyword config compiled once per run for the enrichment helpers."""
+
+    def __init__(self, config: dict):
+        keywords_cfg = config.get("keywords", {}) or {}
+        self.suffix_rules = keywords_cfg.get("service_suffix_rules", []) or []
+        self.suffix_trie = SuffixTrie(rule.get("suffix") or "" for rule in self.suffix_rules)
+        self.service_expansions = keywords_cfg.get("service_expansions", []) or []
+        self.service_triggers = group_automaton(self.service_expansions, "trigger_terms")
+
+        self.name_include_terms = keywords_cfg.get("name_include_terms", []) or []
+        self.name_include = TermAutomaton(self.name_include_terms)
+        self.name_base_terms = keywords_cfg.get("name_base_terms", []) or []
+        self.name_base = TermAutomaton(self.name_base_terms)
+        self.name_suffix_terms = keywords_cfg.get("name_suffix_terms", []) or []
+        self.name_suffix = TermAutomaton(self.name_suffix_terms)
+        self.name_expansions = keywords_cfg.get("name_expansions", []) or []
+        self.name_triggers = group_automaton(self.name_expansions, "trigger_terms")
+
+        self.industry_synonyms = config.get("industry_synonyms", []) or []
+        self.industry_keywords = group_automaton(self.industry_synonyms, "keywords")
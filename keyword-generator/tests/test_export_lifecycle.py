@@ -0,0 +1,107 @@
+from pathlib import Path
+
+import pytest
+import yaml
+
+import main
+from export_index import ExportedKeywordIndex
+from keyword_artifact import KeywordArtifact
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+REVERSE_RESULT = {
+    "results": [
+        {
+            "region": {
+                "area1": {"name": "서울특별시"},
+                "area2": {"name": "서초구"},
+                "area3": {"name": "서초동"},
+                "area4": {"name": ""},
+            }
+        }
+    ]
+}
+
+
+def fake_maps_request(self, path, params):
+    if "reverse" in path:
+        return REVERSE_RESULT
+    if "geocode" in path:
+        return {"addresses": [{"x": "127.0276", "y": "37.4979"}]}
+    return {"places": [{"name": "강남역", "category": "지하철"}], "meta": {"totalCount": 30}}
+
+
+def fake_local_request(self, query, display):
+    return {"total": 40, "items": [{"title": "<b>강남역</b>", "category": "지하철,전철"}]}
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    monkeypatch.setattr(main.NaverMapsClient, "_request", fake_maps_request)
+    monkeypatch.setattr(main.NaverLocalClient, "_request", fake_local_request)
+    for name in ("NAVER_MAPS_CLIENT_ID", "NAVER_MAPS_CLIENT_SECRET", "NAVER_LOCAL_CLIENT_ID", "NAVER_LOCAL_CLIENT_SECRET"):
+        monkeypatch.setenv(name, "test")
+    ad_groups = tmp_path / "ad_groups.csv"
+    ad_groups.write_text("ad_group_id\ng1\n", encoding="utf-8")
+    config = main.load_config(BASE_DIR / "config.yaml")
+    config["region"]["gazetteer_path"] = None
+    config["pois"]["local_index"]["path"] = None
+    config["budget"]["state_path"] = str(tmp_path / "budget.json")
+    config["export_index"]["root"] = str(tmp_path / "index")
+    config["output"]["keywords_per_group"] = 5
+    runs = []
+
+    def run(delta: bool, exclude=()):
+        config["output"]["delta"]["enabled"] = delta
+        config["filters"]["exclude_regex"] = [f"^{keyword}$" for keyword in exclude]
+        config_path = tmp_path / "config.yaml"
+        config_path.write_text(yaml.safe_dump(config, allow_unicode=True), encoding="utf-8")
+        output_dir = tmp_path / f"run{len(runs) + 1}"
+        result = main.run_pipeline(
+            BASE_DIR / "data" / "clients.csv",
+            ad_groups,
+            output_dir,
+            config_path,
+            env_path=tmp_path / ".env",
+            log_level="WARNING",
+            account="acct",
+        )
+        artifact = KeywordArtifact(result["artifact_path"])
+        keywords = list(artifact)
+        artifact.close()
+        runs.append(keywords)
+        return keywords, result
+
+    return run, tmp_path / "index"
+
+
+def test_without_delta_exported_keywords_are_never_emitted_again(pipeline):
+    run, index_root = pipeline
+    first, _ = run(delta=False)
+    second, _ = run(delta=False)
+    third, _ = run(delta=False)
+    assert len(first) == len(second) == len(third) == 5
+    assert not set(first) & set(second)
+    assert not (set(first) | set(second)) & set(third)
+    index = ExportedKeywordIndex(index_root, "acct")
+    try:
+        assert all(keyword in index for keyword in first + second + third)
+    finally:
+        index.close()
+
+
+def test_delta_releases_only_keywords_in_the_remove_package(pipeline):
+    run, index_root = pipeline
+    first, _ = run(delta=True)
+    second, result = run(delta=True, exclude=[first[2]])
+    assert result["delta"]["removed"] == 1
+    assert first[2] not in second
+    assert set(first) - {first[2]} <= set(second)
+    index = ExportedKeywordIndex(index_root, "acct")
+    try:
+        assert first[2] not in index
+    finally:
+        index.close()
+    third, result = run(delta=True)
+    assert first[2] in third
+    assert result["delta"]["removed"] == 1
@@ -0,0 +1,33 @@
+import random
+
+import pytest
+
+import keyword_ranker
+from keyword_ranker import KeywordRanker, rank_key
+
+
+def make_records(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    words = [f"키워드{rng.randrange(count // 2)}" for _ in range(count)]
+    words += ["줄바꿈\n키워드", "역슬래시\\n", "탭\t키워드"]
+    return [(word, rng.randint(1, 5)) for word in words]
+
+
+def in_memory_ranking(records):
+    best = {}
+    for keyword, rank in records:
+        best[keyword] = min(rank, best.get(keyword, rank))
+    return sorted(best.items(), key=rank_key)
+
+
+@pytest.mark.parametrize("spill_threshold, fan_in", [(0, 64), (7, 2), (50, 3), (400, 64)])
+def test_spilled_ranking_matches_in_memory_sort(tmp_path, monkeypatch, spill_threshold, fan_in):
+    monkeypatch.setattr(keyword_ranker, "MERGE_FAN_IN", fan_in)
+    records = make_records(1000)
+    with KeywordRanker(spill_threshold, tmp_path) as ranker:
+        for keyword, rank in records:
+            ranker.add(keyword, rank)
+        expected = in_memory_ranking(records)
+        assert len(ranker) == len(expected)
+        assert list(ranker.ranked()) == expected
+    assert not any(tmp_path.iterdir())
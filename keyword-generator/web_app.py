@@ -1,39 +1,174 @@
+import codecs
 import csv
-import io
+import hmac
+import json
+import multiprocessing
+import os
+import shutil
 import tempfile
+import threading
 import time
 import uuid
-import zipfile
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Sequence, Set, Tuple
 
+from dotenv import load_dotenv
 from fastapi import BackgroundTasks, FastAPI, File, Form, Request, UploadFile
-from fastapi.responses import FileResponse, HTMLResponse, StreamingResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
 
-from main import generate_keywords_from_components, load_config, run_pipeline, write_output
+from export_index import ExportedKeywordIndex
+from jobs import generate_job, read_progress, regenerate_job
+from keyword_artifact import KeywordArtifact
+from main import (
+    AD_GROUP_ID_COLUMN,
+    REQUIRED_INPUT_COLUMNS,
+    ad_group_filename,
+    delta_enabled,
+    delta_removed,
+    group_keywords,
+    load_config,
+    open_export_index,
+    preview_keywords_from_components,
+    record_assignment,
+    render_ad_group_csv,
+    sample_keywords_from_components,
+)
 
 
 BASE_DIR = Path(__file__).resolve().parent
 TEMPLATES = Jinja2Templates(directory=str(BASE_DIR / "templates"))
 
+
+class CompressionMiddleware(GZipMiddleware):
+    """GZip, except event streams (gzip holds them back) and file downloads (zips are compressed)."""
+
+    async def __call__(self, scope, receive, send) -> None:
+        path = scope.get("path", "")
+        if scope["type"] == "http" and (path.endswith("/stream") or path.startswith("/download/")):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
 app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=1024, compresslevel=5)
 CACHE = {}
+CONFIG_CACHE: dict = {}
+EXPORT_INDEXES: dict = {}
+EXPORT_INDEX_LOCK = threading.Lock()
+POOL_LOCK = threading.Lock()
+POOL: Optional[ProcessPoolExecutor] = None
+ADMISSION: Optional[threading.BoundedSemaphore] = None
 
 
-def parse_extra_terms(upload: Optional[UploadFile]) -> List[str]:
-    if not upload:
-        return []
-    raw = upload.file.read()
+class ServerBusy(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("server busy")
+        self.retry_after = retry_after
+
+
+UPLOAD_LABELS = {
+    "input_csv": "입력 CSV",
+    "ad_groups_csv": "광고그룹 CSV",
+    "extra_terms_csv": "추가 키워드 CSV",
+}
+
+
+def upload_settings(config: dict) -> dict:
+    web_cfg = config.get("web", {}) or {}
+    max_mb = web_cfg.get("upload_max_mb", {}) or {}
+    return {
+        "chunk_bytes": int(web_cfg.get("upload_chunk_kb", 1024)) * 1024,
+        "sniff_bytes": int(web_cfg.get("encoding_sniff_kb", 64)) * 1024,
+        "max_bytes": {field: int(float(max_mb.get(field, 20)) * 1024 * 1024) for field in UPLOAD_LABELS},
+    }
+
+
+def detect_encoding(prefix: bytes) -> Tuple[str, str]:
     for encoding in ("utf-8-sig", "cp949"):
         try:
-            text = raw.decode(encoding)
-            break
+            codecs.getincrementaldecoder(encoding)().decode(prefix, final=False)
+            return encoding, "strict"
         except UnicodeDecodeError:
             continue
-    else:
-        text = raw.decode("utf-8", errors="ignore")
-    reader = csv.reader(io.StringIO(text))
+    return "utf-8", "ignore"
+
+
+def iter_upload_text(upload: UploadFile, field: str, settings: dict) -> Iterator[str]:
+    label = UPLOAD_LABELS.get(field, field)
+    max_bytes = settings["max_bytes"][field]
+    too_large = f"{label} 파일이 너무 큽니다. 최대 {max_bytes // (1024 * 1024)}MB까지 업로드할 수 있습니다."
+    if upload.size is not None and upload.size > max_bytes:
+        raise SystemExit(too_large)
+
+    chunk = upload.file.read(settings["sniff_bytes"])
+    encoding, errors = detect_encoding(chunk)
+    decoder = codecs.getincrementaldecoder(encoding)(errors)
+    total = len(chunk)
+    while True:
+        if total > max_bytes:
+            raise SystemExit(too_large)
+        try:
+            text = decoder.decode(chunk, final=not chunk)
+        except UnicodeDecodeError:
+            raise SystemExit(f"{label} 인코딩을 확인해주세요. UTF-8 또는 CP949로 저장된 파일만 지원합니다.")
+        if text:
+            yield text
+        if not chunk:
+            return
+        chunk = upload.file.read(settings["chunk_bytes"])
+        total += len(chunk)
+
+
+def iter_lines(chunks: Iterable[str]) -> Iterator[str]:
+    pending = ""
+    for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield f"{line}\n"
+    if pending:
+        yield pending
+
+
+def check_header(header_line: str, required_columns: Sequence[str], label: str) -> None:
+    header = next(csv.reader([header_line]), [])
+    present = {cell.strip() for cell in header}
+    missing = [column for column in required_columns if column not in present]
+    if missing:
+        raise SystemExit(f"{label}에 필수 컬럼이 없습니다: {', '.join(missing)}")
+
+
+def save_upload(
+    upload: UploadFile,
+    field: str,
+    path: Path,
+    settings: dict,
+    required_columns: Sequence[str] = (),
+) -> None:
+    label = UPLOAD_LABELS.get(field, field)
+    header: Optional[str] = ""
+    with path.open("w", encoding="utf-8", newline="") as handle:
+        for text in iter_upload_text(upload, field, settings):
+            if header is not None:
+                header += text
+                if "\n" in header or len(header) > settings["sniff_bytes"]:
+                    check_header(header.split("\n", 1)[0], required_columns, label)
+                    header = None
+            handle.write(text)
+    if header is not None:
+        check_header(header, required_columns, label)
+
+
+def parse_extra_terms(upload: Optional[UploadFile], settings: dict) -> List[str]:
+    if not upload:
+        return []
+    reader = csv.reader(iter_lines(iter_upload_text(upload, "extra_terms_csv", settings)))
     terms: List[str] = []
     for row in reader:
         for cell in row:
@@ -77,37 +212,200 @@ def parse_pattern_text(text: str) -> List[List[str]]:
     return parse_pattern_values(raw_lines)
 
 
-def build_preview(output_dir: Path, config: dict, limit: int = 100) -> List[str]:
-    output_cfg = config.get("output", {})
-    encoding = output_cfg.get("encoding", "utf-8-sig")
-    header_rows = output_cfg.get("header_rows", [])
-    template = output_cfg.get("template", "")
-    skip_rows = len(header_rows) + 1 if template == "naver_csv" else 1
-    preview: List[str] = []
-    for csv_path in sorted(output_dir.glob("*.csv")):
-        with csv_path.open("r", encoding=encoding, newline="") as handle:
-            reader = csv.reader(handle)
-            for row_index, row in enumerate(reader):
-                if row_index < skip_rows:
-                    continue
-                if len(row) < 2:
-                    continue
-                keyword = row[1].strip()
-                if keyword:
-                    preview.append(keyword)
-                if len(preview) >= limit:
-                    return preview
-    return preview
-
-
-def store_zip(buffer: io.BytesIO) -> str:
+COMPONENT_NAMES = ("regions", "services", "modifiers", "pois")
+
+
+def cached_config() -> dict:
+    # Read-only callers on hot paths share one parse per config.yaml mtime.
+    path = BASE_DIR / "config.yaml"
+    mtime = path.stat().st_mtime
+    if CONFIG_CACHE.get("mtime") != mtime:
+        CONFIG_CACHE.update(mtime=mtime, config=load_config(path))
+    return CONFIG_CACHE["config"]
+
+
+def page_settings(config: dict) -> Tuple[int, int]:
+    web_cfg = config.get("web", {}) or {}
+    return int(web_cfg.get("page_size", 100)), int(web_cfg.get("page_size_max", 1000))
+
+
+def parse_cursor(cursor: Optional[str]) -> Optional[int]:
+    if not cursor:
+        return 0
+    try:
+        offset = int(cursor)
+    except ValueError:
+        return None
+    return offset if offset >= 0 else None
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match", "")
+    candidates = {value.strip().removeprefix("W/") for value in header.split(",")}
+    return etag in candidates or "*" in candidates
+
+
+def paged_response(
+    request: Request,
+    token: str,
+    kind: str,
+    items: Sequence[str],
+    cursor: Optional[str],
+    limit: Optional[int],
+) -> Response:
+    config = cached_config()
+    default_limit, max_limit = page_settings(config)
+    offset = parse_cursor(cursor)
+    if offset is None:
+        return JSONResponse({"error": "invalid cursor"}, status_code=400)
+    limit = min(max(limit or default_limit, 1), max_limit)
+
+    # Job results never change once stored, so the page coordinates identify the body.
+    etag = f'"{token}-{kind}-{offset}-{limit}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    end = offset + limit
+    payload = {
+        "items": list(items[offset:end]),
+        "offset": offset,
+        "total": len(items),
+        "next_cursor": str(end) if end < len(items) else None,
+    }
+    return JSONResponse(payload, headers=headers)
+
+
+def prune_jobs(config: dict) -> None:
+    ttl_sec = float((config.get("web", {}) or {}).get("job_ttl_min", 120)) * 60
+    cutoff = time.time() - ttl_sec
+    for token, entry in list(CACHE.items()):
+        if entry.get("created", 0) < cutoff:
+            entry["path"].unlink(missing_ok=True)
+            artifact = entry.get("artifact")
+            if artifact:
+                artifact.close()
+                artifact.path.unlink(missing_ok=True)
+            CACHE.pop(token, None)
+
+
+def store_artifact(source: Path) -> KeywordArtifact:
+    path = Path(tempfile.gettempdir()) / f"keyword_artifact_{uuid.uuid4().hex}.kga"
+    shutil.move(str(source), path)
+    return KeywordArtifact(path)
+
+
+def store_zip(source: Path, config: dict) -> str:
+    prune_jobs(config)
     token = uuid.uuid4().hex
     path = Path(tempfile.gettempdir()) / f"keyword_export_{token}.zip"
-    path.write_bytes(buffer.getvalue())
+    shutil.move(str(source), path)
     CACHE[token] = {"path": path, "created": time.time()}
     return token
 
 
+def group_slices(total: int, entry: dict) -> List[int]:
+    per_group = entry.get("keywords_per_group", 1000)
+    return [min(index * per_group, total) for index in range(len(entry.get("ad_group_ids", [])) + 1)]
+
+
+def record_export(entry: dict) -> None:
+    if entry.get("recorded") or not entry.get("artifact"):
+        return
+    exported_index = open_export_index(cached_config(), entry.get("account"))
+    if exported_index is None:
+        return
+    try:
+        artifact = entry["artifact"]
+        offsets = entry.get("group_offsets") or group_slices(len(artifact), entry)
+        record_assignment(
+            exported_index,
+            entry.get("ad_group_ids", []),
+            artifact,
+            offsets,
+            entry.get("group_order"),
+            entry.get("delta_removed", False),
+        )
+        entry["recorded"] = True
+    finally:
+        exported_index.close()
+
+
+def worker_settings(config: dict) -> dict:
+    web_cfg = config.get("web", {}) or {}
+    workers = int(web_cfg.get("worker_processes", 2))
+    return {
+        "workers": workers,
+        "max_jobs": max(int(web_cfg.get("heavy_jobs_max", workers or 1)), 1),
+        "queue_wait_sec": float(web_cfg.get("queue_wait_sec", 5)),
+        "retry_after_sec": int(web_cfg.get("retry_after_sec", 30)),
+    }
+
+
+def submit_heavy_job(config: dict, func, *args, **kwargs) -> Future:
+    """Start a job in the worker pool; raises ServerBusy when no slot frees up within ``queue_wait_sec``."""
+    global POOL, ADMISSION
+    settings = worker_settings(config)
+    with POOL_LOCK:
+        if ADMISSION is None:
+            ADMISSION = threading.BoundedSemaphore(settings["max_jobs"])
+        if POOL is None and settings["workers"] > 0:
+            POOL = ProcessPoolExecutor(settings["workers"], mp_context=multiprocessing.get_context("spawn"))
+        pool = POOL
+    admission = ADMISSION
+    if not admission.acquire(timeout=settings["queue_wait_sec"]):
+        raise ServerBusy(settings["retry_after_sec"])
+
+    def finished(future: Future) -> None:
+        global POOL
+        admission.release()
+        if isinstance(future.exception(), BrokenProcessPool):
+            with POOL_LOCK:
+                if POOL is pool:
+                    POOL = None
+
+    if pool is None:
+        future: Future = Future()
+        try:
+            future.set_result(func(*args, **kwargs))
+        except BaseException as exc:  # noqa: BLE001
+            future.set_exception(exc)
+    else:
+        try:
+            future = pool.submit(func, *args, **kwargs)
+        except BaseException as exc:  # noqa: BLE001
+            future = Future()
+            future.set_exception(exc)
+    future.add_done_callback(finished)
+    return future
+
+
+def run_heavy_job(config: dict, func, *args, **kwargs):
+    return submit_heavy_job(config, func, *args, **kwargs).result()
+
+
+def busy_response(request: Request, exc: ServerBusy) -> HTMLResponse:
+    return TEMPLATES.TemplateResponse(
+        "index.html",
+        {"request": request, "error": f"요청이 많아 처리할 수 없습니다. {exc.retry_after}초 후에 다시 시도해주세요."},
+        status_code=503,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.on_event("shutdown")
+def shutdown_pool() -> None:
+    if POOL is not None:
+        POOL.shutdown(cancel_futures=True)
+
+
+def is_admin(config: dict, admin_token: str) -> bool:
+    load_dotenv(BASE_DIR / ".env")
+    env_name = (config.get("web", {}) or {}).get("admin_token_env", "KEYWORD_ADMIN_TOKEN")
+    expected = os.getenv(env_name, "")
+    return bool(expected) and hmac.compare_digest(expected.encode("utf-8"), admin_token.encode("utf-8"))
+
+
 @app.get("/", response_class=HTMLResponse)
 def index(request: Request) -> HTMLResponse:
     return TEMPLATES.TemplateResponse("index.html", {"request": request})
@@ -121,30 +419,46 @@ def generate(
     extra_terms_csv: UploadFile | None = File(None),
     output_name: str = Form("keyword_exports"),
     poi_filter_set: str = Form("default"),
+    account: str = Form(""),
+    profile: bool = Form(False),
+    admin_token: str = Form(""),
 ):
+    config_path = BASE_DIR / "config.yaml"
+    config = load_config(config_path)
+    settings = upload_settings(config)
+    if profile and not is_admin(config, admin_token):
+        return TEMPLATES.TemplateResponse(
+            "index.html",
+            {"request": request, "error": "프로파일링은 관리자 토큰이 있어야 사용할 수 있습니다."},
+            status_code=403,
+        )
     with tempfile.TemporaryDirectory() as tmp_dir:
         tmp_path = Path(tmp_dir)
         input_path = tmp_path / "input.csv"
         ad_groups_path = tmp_path / "ad_groups.csv"
-        output_dir = tmp_path / "output"
-        config_path = BASE_DIR / "config.yaml"
 
-        input_path.write_bytes(input_csv.file.read())
-        ad_groups_path.write_bytes(ad_groups_csv.file.read())
-
-        extra_terms = parse_extra_terms(extra_terms_csv)
         try:
-            result = run_pipeline(
+            save_upload(input_csv, "input_csv", input_path, settings, REQUIRED_INPUT_COLUMNS)
+            save_upload(ad_groups_csv, "ad_groups_csv", ad_groups_path, settings, [AD_GROUP_ID_COLUMN])
+            extra_terms = parse_extra_terms(extra_terms_csv, settings)
+            result = run_heavy_job(
+                config,
+                generate_job,
+                tmp_path,
                 input_path=input_path,
                 ad_groups_path=ad_groups_path,
-                output_dir=output_dir,
                 config_path=config_path,
                 env_path=BASE_DIR / ".env",
                 log_level="INFO",
                 extra_service_terms=extra_terms,
                 allow_shortfall=True,
                 poi_filter_set=poi_filter_set,
+                account=account.strip() or None,
+                record_export=False,
+                profile=profile,
             )
+        except ServerBusy as exc:
+            return busy_response(request, exc)
         except SystemExit as exc:
             return TEMPLATES.TemplateResponse(
                 "index.html",
@@ -158,32 +472,29 @@ def generate(
                 status_code=500,
             )
 
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-            for csv_path in sorted(output_dir.glob("*.csv")):
-                zip_file.write(csv_path, arcname=csv_path.name)
-        zip_buffer.seek(0)
-        token = store_zip(zip_buffer)
+        profile_result = result.get("profile")
+        token = store_zip(result["zip_path"], config)
         CACHE[token].update(
             {
                 "ad_group_ids": result.get("ad_group_ids", []),
                 "keywords_per_group": result.get("keywords_per_group", 1000),
                 "output_name": output_name,
                 "poi_filter_set": poi_filter_set,
+                "account": account.strip(),
+                "artifact": store_artifact(result["artifact_path"]),
+                "group_offsets": result.get("group_offsets"),
+                "group_order": result.get("group_order"),
+                "delta_removed": delta_removed(result.get("delta")),
+                "components": result.get("components", {}),
             }
         )
-        config = load_config(config_path)
-        preview = build_preview(output_dir, config, limit=100)
-        shortfall = result.get("shortfall", 0)
-        warning = None
-        if shortfall > 0:
-            warning = (
-                f"키워드가 부족합니다. 생성 {result.get('generated_total')}개 / "
-                f"필요 {result.get('target_total')}개"
-            )
-        components = result.get("components", {})
+        warnings = export_warnings(result)
+        if result.get("degraded"):
+            labels = {"landmark": "랜드마크", "subway": "지하철역", "competition": "경쟁업체 반경"}
+            skipped = ", ".join(labels.get(group, group) for group in result["degraded"])
+            warnings.append(f"API 호출 한도 때문에 {skipped} 조회를 건너뛰었습니다.")
+        warning = " ".join(warnings) or None
         patterns = result.get("patterns", [])
-        config = load_config(config_path)
         pattern_options = config.get("keywords", {}).get("patterns", [])
         pattern_values = [",".join(p) for p in pattern_options]
         selected_values = {",".join(p) for p in patterns}
@@ -192,20 +503,17 @@ def generate(
             "index.html",
             {
                 "request": request,
-                "preview": preview,
                 "download_url": f"/download/{token}",
                 "output_name": output_name,
                 "warning": warning,
                 "token": token,
-                "regions_text": "\n".join(components.get("regions", [])),
-                "services_text": "\n".join(components.get("services", [])),
-                "modifiers_text": "\n".join(components.get("modifiers", [])),
-                "pois_text": "\n".join(components.get("pois", [])),
                 "pattern_options": pattern_values,
                 "selected_patterns": selected_values,
                 "patterns_custom_text": "",
                 "poi_filter_sets": poi_filter_sets,
                 "poi_filter_set": poi_filter_set,
+                "account": account.strip(),
+                "profile": profile_result,
             },
         )
 
@@ -220,15 +528,197 @@ def download(token: str, background_tasks: BackgroundTasks):
         return HTMLResponse("다운로드 파일을 찾을 수 없습니다.", status_code=404)
 
     def cleanup() -> None:
-        try:
-            path.unlink(missing_ok=True)
-        finally:
-            CACHE.pop(token, None)
+        path.unlink(missing_ok=True)
+        record_export(entry)
 
     background_tasks.add_task(cleanup)
     return FileResponse(path=path, filename=path.name, media_type="application/zip")
 
 
+@app.get("/download/{token}/groups/{number}")
+def download_group(token: str, number: int, per_group: Optional[int] = None):
+    entry = CACHE.get(token)
+    if not entry or not entry.get("artifact"):
+        return HTMLResponse("다운로드 링크가 만료되었습니다.", status_code=404)
+    artifact = entry["artifact"]
+    ad_group_ids = entry.get("ad_group_ids", [])
+    if not 1 <= number <= len(ad_group_ids):
+        return HTMLResponse("광고그룹을 찾을 수 없습니다.", status_code=404)
+    offsets = entry.get("group_offsets")
+    if per_group is None and offsets:
+        keywords = group_keywords(artifact, offsets, entry.get("group_order"), number - 1)
+    else:
+        per_group = min(max(per_group or entry.get("keywords_per_group", 1000), 1), max(len(artifact), 1))
+        start = (number - 1) * per_group
+        keywords = artifact[start : start + per_group]
+    config = cached_config()
+    body = render_ad_group_csv(ad_group_ids[number - 1], keywords, config)
+    filename = ad_group_filename(number - 1)
+    return Response(
+        body,
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@app.get("/api/jobs/{token}/keywords")
+def job_keywords(request: Request, token: str, cursor: Optional[str] = None, limit: Optional[int] = None):
+    entry = CACHE.get(token)
+    if not entry:
+        return JSONResponse({"error": "job not found"}, status_code=404)
+    return paged_response(request, token, "keywords", entry.get("artifact") or [], cursor, limit)
+
+
+@app.get("/api/jobs/{token}/components/{name}")
+def job_components(
+    request: Request,
+    token: str,
+    name: str,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+):
+    entry = CACHE.get(token)
+    if not entry:
+        return JSONResponse({"error": "job not found"}, status_code=404)
+    if name not in COMPONENT_NAMES:
+        return JSONResponse({"error": f"unknown component: {name}"}, status_code=404)
+    items = entry.get("components", {}).get(name, [])
+    return paged_response(request, token, f"components-{name}", items, cursor, limit)
+
+
+class JobExportedKeywords:
+    """An account's shared exported-keyword index, seen with one job's ad groups exempt."""
+
+    def __init__(self, exported_index: ExportedKeywordIndex, exempt_groups: Set[str]):
+        self.exported_index = exported_index
+        self.exempt_groups = exempt_groups
+
+    def __contains__(self, keyword: str) -> bool:
+        with EXPORT_INDEX_LOCK:
+            return self.exported_index.exported(keyword, self.exempt_groups)
+
+
+def open_job_export_index(config: dict, entry: dict) -> Optional[JobExportedKeywords]:
+    # Same exported-keyword view the regenerate job uses, so previews match its output. The index
+    # stays open per account; its filter is only reloaded after an export bumps the generation.
+    account = entry.get("account")
+    key = (account, json.dumps(config.get("export_index", {}) or {}, sort_keys=True, default=str))
+    with EXPORT_INDEX_LOCK:
+        exported_index = EXPORT_INDEXES.get(key)
+        if exported_index is None:
+            exported_index = open_export_index(config, account)
+            if exported_index is None:
+                return None
+            EXPORT_INDEXES[key] = exported_index
+        else:
+            exported_index.refresh()
+    exempt_groups = set(entry.get("ad_group_ids", [])) if delta_enabled(config) else set()
+    return JobExportedKeywords(exported_index, exempt_groups)
+
+
+@app.post("/api/jobs/{token}/sample")
+def job_sample(
+    token: str,
+    regions: str = Form(""),
+    services: str = Form(""),
+    modifiers: str = Form(""),
+    pois: str = Form(""),
+    patterns: List[str] = Form([]),
+    patterns_custom: str = Form(""),
+    size: Optional[int] = Form(None),
+    mode: str = Form("uniform"),
+    seed: Optional[int] = Form(None),
+):
+    """Random keywords the submitted components and patterns would produce, with per-pattern counts."""
+    entry = CACHE.get(token)
+    if not entry:
+        return JSONResponse({"error": "job not found"}, status_code=404)
+    if mode not in ("uniform", "stratified"):
+        return JSONResponse({"error": f"unknown sample mode: {mode}"}, status_code=400)
+    config = cached_config()
+    page_size, page_size_max = page_settings(config)
+    components = regenerate_components(regions, services, modifiers, pois)
+    pattern_list = regenerate_patterns(config, patterns, patterns_custom)
+    started = time.perf_counter()
+    result = sample_keywords_from_components(
+        components["regions"],
+        components["services"],
+        components["modifiers"],
+        components["pois"],
+        pattern_list,
+        config,
+        min(max(size or page_size, 1), page_size_max),
+        mode,
+        seed,
+        open_job_export_index(config, entry),
+        int((config.get("web", {}) or {}).get("sample_max_draws_factor", 20)),
+    )
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return JSONResponse(result)
+
+
+def regenerate_components(regions: str, services: str, modifiers: str, pois: str) -> dict:
+    return {
+        "regions": parse_lines(regions),
+        "services": parse_lines(services),
+        "modifiers": parse_lines(modifiers),
+        "pois": parse_lines(pois),
+    }
+
+
+def regenerate_patterns(config: dict, patterns: List[str], patterns_custom: str) -> List[List[str]]:
+    pattern_list = parse_pattern_values(patterns) + parse_pattern_text(patterns_custom)
+    return pattern_list or config.get("keywords", {}).get("patterns", [])
+
+
+def regenerate_args(entry: dict, components: dict, pattern_list: List[List[str]]) -> tuple:
+    return (
+        components["regions"],
+        components["services"],
+        components["modifiers"],
+        components["pois"],
+        pattern_list,
+        entry.get("ad_group_ids", []),
+        entry.get("keywords_per_group", 1000),
+        entry.get("account"),
+    )
+
+
+def store_regenerated(entry: dict, result: dict, components: dict, config: dict) -> str:
+    artifact = store_artifact(result["artifact_path"])
+    new_token = store_zip(result["zip_path"], config)
+    CACHE[new_token].update(
+        {
+            "ad_group_ids": entry.get("ad_group_ids", []),
+            "keywords_per_group": entry.get("keywords_per_group", 1000),
+            "output_name": entry.get("output_name", "keyword_exports"),
+            "poi_filter_set": entry.get("poi_filter_set", "default"),
+            "account": entry.get("account", ""),
+            "artifact": artifact,
+            "group_offsets": result.get("group_offsets"),
+            "group_order": result.get("group_order"),
+            "delta_removed": delta_removed(result.get("delta")),
+            "components": components,
+        }
+    )
+    return new_token
+
+
+def export_warnings(result: dict) -> List[str]:
+    warnings = []
+    if result.get("shortfall", 0) > 0:
+        warnings.append(
+            f"키워드가 부족합니다. 생성 {result.get('generated_total')}개 / 필요 {result.get('target_total')}개"
+        )
+    delta = result.get("delta")
+    if delta and delta["previous_total"]:
+        warnings.append(
+            f"이전 내보내기 대비 변경분만 압축했습니다. 추가 {delta['added']}개, 삭제 {delta['removed']}개 "
+            f"(변경된 광고그룹 {delta['changed_groups']}개)"
+        )
+    return warnings
+
+
 @app.post("/regenerate")
 def regenerate(
     request: Request,
@@ -250,70 +740,143 @@ def regenerate(
 
     config_path = BASE_DIR / "config.yaml"
     config = load_config(config_path)
-    region_terms = parse_lines(regions)
-    service_terms = parse_lines(services)
-    modifier_terms = parse_lines(modifiers)
-    poi_terms = parse_lines(pois)
-    pattern_list = parse_pattern_values(patterns) + parse_pattern_text(patterns_custom)
+    components = regenerate_components(regions, services, modifiers, pois)
+    pattern_list = regenerate_patterns(config, patterns, patterns_custom)
     pattern_options = config.get("keywords", {}).get("patterns", [])
-    if not pattern_list:
-        pattern_list = pattern_options
     selected_values = {",".join(p) for p in pattern_list}
 
-    keyword_rank = generate_keywords_from_components(
-        region_terms,
-        service_terms,
-        modifier_terms,
-        poi_terms,
-        pattern_list,
-        config,
-    )
-
-    ad_group_ids = entry.get("ad_group_ids", [])
-    keywords_per_group = entry.get("keywords_per_group", 1000)
-    target_total = len(ad_group_ids) * keywords_per_group
-
-    sorted_keywords = sorted(
-        keyword_rank.items(),
-        key=lambda item: (item[1], len(item[0]), item[0]),
-    )
-    final_keywords = [keyword for keyword, _ in sorted_keywords[:target_total]]
-    shortfall = max(0, target_total - len(final_keywords))
-
     with tempfile.TemporaryDirectory() as tmp_dir:
-        tmp_path = Path(tmp_dir)
-        output_dir = tmp_path / "output"
-        write_output(output_dir, ad_group_ids, final_keywords, keywords_per_group, config)
-
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-            for csv_path in sorted(output_dir.glob("*.csv")):
-                zip_file.write(csv_path, arcname=csv_path.name)
-        zip_buffer.seek(0)
-        new_token = store_zip(zip_buffer)
-        preview = build_preview(output_dir, config, limit=100)
-
-    warning = None
-    if shortfall > 0:
-        warning = f"키워드가 부족합니다. 생성 {len(final_keywords)}개 / 필요 {target_total}개"
+        try:
+            result = run_heavy_job(
+                config,
+                regenerate_job,
+                Path(tmp_dir),
+                config_path,
+                *regenerate_args(entry, components, pattern_list),
+            )
+        except ServerBusy as exc:
+            return busy_response(request, exc)
+        except SystemExit as exc:
+            return TEMPLATES.TemplateResponse(
+                "index.html",
+                {"request": request, "error": str(exc)},
+                status_code=400,
+            )
+        except Exception as exc:  # noqa: BLE001
+            return TEMPLATES.TemplateResponse(
+                "index.html",
+                {"request": request, "error": f"처리 중 오류가 발생했습니다: {exc}"},
+                status_code=500,
+            )
+        new_token = store_regenerated(entry, result, components, config)
 
     return TEMPLATES.TemplateResponse(
         "index.html",
         {
             "request": request,
-            "preview": preview,
             "download_url": f"/download/{new_token}",
             "output_name": entry.get("output_name", "keyword_exports"),
-            "warning": warning,
+            "warning": " ".join(export_warnings(result)) or None,
             "token": new_token,
-            "regions_text": "\n".join(region_terms),
-            "services_text": "\n".join(service_terms),
-            "modifiers_text": "\n".join(modifier_terms),
-            "pois_text": "\n".join(poi_terms),
             "pattern_options": [",".join(p) for p in pattern_options],
             "selected_patterns": selected_values,
             "patterns_custom_text": patterns_custom.strip(),
             "poi_filter_sets": list((config.get("pois", {}).get("filter_sets") or {}).keys()),
             "poi_filter_set": entry.get("poi_filter_set", "default"),
+            "account": entry.get("account", ""),
         },
     )
+
+
+def sse_event(event: str, data: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+@app.post("/regenerate/stream")
+def regenerate_stream(
+    token: str = Form(...),
+    regions: str = Form(""),
+    services: str = Form(""),
+    modifiers: str = Form(""),
+    pois: str = Form(""),
+    patterns: List[str] = Form([]),
+    patterns_custom: str = Form(""),
+):
+    """Regenerate with server-sent events: ``preview``, ``progress``, then ``done`` or ``error``."""
+    entry = CACHE.get(token)
+    if not entry:
+        return JSONResponse({"error": "세션이 만료되었습니다. 다시 생성해주세요."}, status_code=400)
+
+    config_path = BASE_DIR / "config.yaml"
+    config = load_config(config_path)
+    web_cfg = config.get("web", {}) or {}
+    components = regenerate_components(regions, services, modifiers, pois)
+    pattern_list = regenerate_patterns(config, patterns, patterns_custom)
+    args = regenerate_args(entry, components, pattern_list)
+    work_dir = Path(tempfile.mkdtemp(prefix="keyword_regenerate_"))
+    progress_path = work_dir / "progress.json"
+    try:
+        future = submit_heavy_job(config, regenerate_job, work_dir, config_path, *args, progress_path)
+    except ServerBusy as exc:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        return JSONResponse(
+            {"error": f"요청이 많아 처리할 수 없습니다. {exc.retry_after}초 후에 다시 시도해주세요."},
+            status_code=503,
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+
+    def events() -> Iterator[bytes]:
+        try:
+            started = time.perf_counter()
+            preview = preview_keywords_from_components(
+                *args[:5],
+                config,
+                page_settings(config)[0],
+                int(web_cfg.get("stream_preview_max_combinations", 200000)),
+                open_job_export_index(config, entry),
+            )
+            yield sse_event(
+                "preview",
+                {"keywords": preview, "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)},
+            )
+
+            last_progress = None
+            poll_sec = float(web_cfg.get("stream_progress_sec", 0.5))
+            while True:
+                try:
+                    result = future.result(timeout=poll_sec)
+                    break
+                except FutureTimeout:
+                    progress = read_progress(progress_path)
+                    if progress and progress != last_progress:
+                        last_progress = progress
+                        yield sse_event("progress", progress)
+                except SystemExit as exc:
+                    yield sse_event("error", {"message": str(exc)})
+                    return
+                except Exception as exc:  # noqa: BLE001
+                    yield sse_event("error", {"message": f"처리 중 오류가 발생했습니다: {exc}"})
+                    return
+
+            new_token = store_regenerated(entry, result, components, config)
+            yield sse_event(
+                "done",
+                {
+                    "token": new_token,
+                    "download_url": f"/download/{new_token}",
+                    "generated_total": result["generated_total"],
+                    "target_total": result["target_total"],
+                    "warning": " ".join(export_warnings(result)) or None,
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+                },
+            )
+        finally:
+            if not future.done():
+                future.cancel()
+            future.add_done_callback(lambda _: shutil.rmtree(work_dir, ignore_errors=True))
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )